@@ -0,0 +1,695 @@
+"""HTTP API: polling, article listing and delta sync, metrics and debug routes
+
+Run with `uvicorn api:app`. Only FastAPI and the light local modules are
+imported up front; feedparser, newspaper and the Supabase client load the
+first time a poll, extraction or store call needs them.
+"""
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from dotenv import load_dotenv
+import os
+import base64
+from typing import Optional
+import json
+import queue
+import threading
+import time
+import metrics
+from storage import ChangeCursorExpired, close_store, get_store
+from feeds import RSS_FEEDS
+from ingest import add_ingest_listener, ingest_feeds
+from scheduler import PollScheduler
+from jobs import PollJobManager
+from extraction import extract_article_metadata, shutdown_parse_pool
+from records import dumps, json_safe
+from http_caching import conditional_response, make_etag
+from enrichment import get_enricher, stop_enricher
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with records.dumps (orjson when installed)"""
+
+    def render(self, content):
+        return dumps(content)
+
+app = FastAPI(default_response_class=FastJSONResponse)
+
+load_dotenv()
+
+# Polls each feed on its own adaptive interval while the API is running
+poll_scheduler = PollScheduler(RSS_FEEDS, ingest_feeds)
+
+@app.on_event("startup")
+def startup():
+    # One shared store (pooled Supabase client or SQLite) for the whole process
+    get_store()
+    # Set POLL_SCHEDULER=0 to disable (e.g. on extra API workers)
+    if os.getenv("POLL_SCHEDULER", "1") != "0":
+        poll_scheduler.start()
+        # Summaries and keywords for what the scheduler stores; ENRICHMENT=0 to disable
+        if os.getenv("ENRICHMENT", "1") != "0":
+            enricher = get_enricher()
+            add_ingest_listener(lambda result: enricher.wake())
+            enricher.start()
+
+@app.on_event("shutdown")
+def shutdown():
+    poll_scheduler.stop()
+    stop_enricher()
+    shutdown_parse_pool()
+    close_store()
+
+@app.middleware("http")
+async def record_request_latency(request, call_next):
+    """Request latency per route template (not per raw path, which would explode the labels)"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=status
+        )
+
+@app.get("/metrics")
+def get_metrics():
+    """Ingest stage and API latency metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/")
+def read_root():
+    return {"message": "Hello, World!"}
+
+# Manual polls run as background jobs; requests made while one is running join it
+poll_jobs = PollJobManager(lambda force, progress: ingest_feeds(RSS_FEEDS, force=force, progress=progress))
+
+# Create poll endpoint
+@app.get("/poll", status_code=202)
+@app.post("/poll", status_code=202)
+def poll(force: bool = False):
+    """Start polling all feeds in the background and return the job to follow"""
+    job, coalesced = poll_jobs.submit(force=force)
+    return {
+        "message": "Poll already running" if coalesced else "Polling started",
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "coalesced": coalesced,
+        "status_url": f"/poll/jobs/{job['job_id']}"
+    }
+
+@app.get("/poll/jobs")
+def list_poll_jobs():
+    """Recent poll jobs, newest first"""
+    return {"jobs": poll_jobs.list()}
+
+@app.get("/poll/jobs/{job_id}")
+def poll_job_status(job_id: str):
+    """Progress of a poll job per stage, and its feed_statistics once finished"""
+    job = poll_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown poll job")
+    return job
+
+# Events a slow stream client may fall behind by before progress events are dropped
+POLL_STREAM_BUFFER = 1000
+
+def format_poll_event(stage, info, stream_format):
+    """One progress event as an NDJSON line or a server-sent event"""
+    data = dumps({"event": stage, **info}).decode("utf-8")
+    if stream_format == "sse":
+        return f"event: {stage}\ndata: {data}\n\n"
+    return data + "\n"
+
+@app.get("/poll/stream")
+@app.post("/poll/stream")
+def poll_stream(force: bool = False, format: str = Query("ndjson", pattern="^(ndjson|sse)$")):
+    """Start (or join) a poll and stream its progress as NDJSON or server-sent events"""
+    events = queue.Queue(maxsize=POLL_STREAM_BUFFER)
+    closed = threading.Event()
+    
+    def listener(stage, info):
+        if stage != "finished":
+            try:
+                events.put_nowait((stage, info))
+            except queue.Full:
+                # Client is behind; the job status endpoint still has the totals
+                pass
+            return
+        # The final event must get through, wait for the client to catch up
+        while not closed.is_set():
+            try:
+                events.put((stage, info), timeout=0.5)
+                return
+            except queue.Full:
+                continue
+    
+    job, coalesced = poll_jobs.submit(force=force, listener=listener)
+    
+    def stream():
+        try:
+            yield format_poll_event("job", {
+                "job_id": job["job_id"],
+                "status": job["status"],
+                "coalesced": coalesced,
+                "status_url": f"/poll/jobs/{job['job_id']}"
+            }, format)
+            while True:
+                stage, info = events.get()
+                yield format_poll_event(stage, info, format)
+                if stage == "finished":
+                    break
+        finally:
+            closed.set()
+            poll_jobs.unsubscribe(job["job_id"], listener)
+    
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/scheduler")
+def scheduler_status():
+    """Current per-feed polling intervals and results of the background scheduler"""
+    return poll_scheduler.status()
+
+@app.get("/enrichment")
+def enrichment_status():
+    """Progress of the background summary and keyword enrichment"""
+    return get_enricher().status()
+
+# Columns callers may request from /list; "excerpt" is derived from content
+LIST_COLUMNS = ["id", "title", "content", "link", "published", "author", "publisher",
+                "description", "summary", "keywords", "created_at", "duplicate_of"]
+DEFAULT_LIST_FIELDS = ["id", "title", "content", "link", "published", "author", "publisher",
+                       "description", "summary", "keywords", "duplicate_of"]
+EXCERPT_LENGTH = 500
+
+def list_columns(requested):
+    """Store columns needed to answer the requested /list fields"""
+    # The cursor columns are always needed, the excerpt is cut from content
+    columns = [c for c in requested if c != "excerpt"]
+    for column in ["id", "created_at"]:
+        if column not in columns:
+            columns.append(column)
+    if "excerpt" in requested and "content" not in columns:
+        columns.append("content")
+    return columns
+
+def project_article(article, requested):
+    """The requested fields of one stored row, as /list returns them"""
+    processed_article = {field: article.get(field) for field in requested if field != "excerpt"}
+    if "excerpt" in requested:
+        content = article.get("content") or ""
+        processed_article["excerpt"] = content[:EXCERPT_LENGTH] + "..." if len(content) > EXCERPT_LENGTH else content
+    if "content" in requested:
+        processed_article["has_content"] = article.get("content") is not None
+        processed_article["content_length"] = len(article.get("content") or "")
+    return processed_article
+
+def encode_cursor(row):
+    """Opaque keyset cursor pointing just after the given row"""
+    raw = json.dumps([row["created_at"], row["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Decode a cursor from encode_cursor into (created_at, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(created_at), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def parse_list_fields(fields):
+    """Validate the comma separated fields parameter of /list"""
+    if not fields:
+        return list(DEFAULT_LIST_FIELDS)
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in LIST_COLUMNS and field != "excerpt"]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+@app.get("/list")
+def list_articles(
+    request: Request,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    publisher: Optional[str] = None,
+    search: Optional[str] = None,
+):
+    """Get recent articles from database, newest first, one page at a time
+
+    Pagination is keyset based on (created_at, id): pass the returned
+    next_cursor to get the following page. `fields` selects which columns are
+    returned (e.g. leave out `content`, or ask for a short `excerpt` instead).
+
+    The ETag follows the store's version, so a client sending it back in
+    If-None-Match gets a 304 until the next ingest writes rows. Bodies are
+    brotli or gzip compressed when the client accepts it.
+    """
+    requested = parse_list_fields(fields)
+    columns = list_columns(requested)
+    after = decode_cursor(cursor) if cursor else None
+    
+    # Nothing written since the client's copy: answer before touching the rows
+    store = get_store()
+    etag = make_etag(store.name, store.version(), limit, cursor, ",".join(requested), publisher, search)
+    return conditional_response(request, etag, lambda: dumps(
+        list_page(store, requested, columns, limit, after, publisher, search)))
+
+def list_page(store, requested, columns, limit, after, publisher, search):
+    """One /list response body"""
+    # Fetch one extra row to know whether another page exists
+    rows = store.list(columns, limit=limit + 1, after=after, publisher=publisher, search=search)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    # Only return what was asked for
+    processed_articles = [project_article(article, requested) for article in rows]
+    
+    response = {
+        "articles": processed_articles,
+        "total_articles": len(processed_articles),
+        "next_cursor": encode_cursor(rows[-1]) if has_more else None,
+        "has_more": has_more
+    }
+    if "content" in requested:
+        response["articles_with_content"] = sum(1 for a in processed_articles if a.get("content"))
+    # Store rows are already JSON-safe, so this is encoded directly without jsonable_encoder
+    return response
+
+def encode_position(position):
+    """Opaque /list/changes position from a store position"""
+    return base64.urlsafe_b64encode(position.encode()).decode().rstrip("=")
+
+def decode_position(since):
+    try:
+        return base64.urlsafe_b64decode(since + "=" * (-len(since) % 4)).decode()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid since position")
+
+@app.get("/list/changes")
+def list_changes(
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=500),
+    fields: Optional[str] = None,
+):
+    """Articles inserted or updated after a position, oldest change first
+
+    Without `since` no articles are returned, only the current position:
+    take it before loading the full list, then pass the returned `since` on
+    each call to receive just what was written in between. `reset` means the
+    position can't be resumed (e.g. a new database) and the caller should
+    reload everything from /list.
+    """
+    requested = parse_list_fields(fields)
+    store = get_store()
+    try:
+        rows, position = store.changes(
+            decode_position(since) if since is not None else None, list_columns(requested), limit=limit)
+    except ChangeCursorExpired:
+        rows, position = store.changes(None)
+        return FastJSONResponse({"articles": [], "since": encode_position(position), "has_more": False, "reset": True})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse({
+        "articles": [project_article(article, requested) for article in rows],
+        "since": encode_position(position),
+        # A full page may be followed by more
+        "has_more": len(rows) == limit,
+        "reset": False
+    })
+
+@app.get("/poll-with-content")
+def poll_with_content():
+    """Poll endpoint that explicitly includes content field"""
+    # create dictionary off rss feeds
+    rss_feeds = {
+        "ithacavoice": "https://ithacavoice.org/feed",
+    }
+    
+    # fetch and insert new or updated articles into database
+    ingest_feeds(rss_feeds)
+    
+    print("Articles inserted into database")
+    
+    # Get recent articles with explicit content selection
+    recent_articles = get_store().list(["id", "title", "content", "link", "published", "author", "publisher", "description", "summary", "keywords"], limit=10)
+    
+    # Process articles to ensure content is included
+    processed_articles = []
+    for article in recent_articles:
+        processed_article = {
+            "id": article.get("id"),
+            "title": article.get("title"),
+            "content": article.get("content"),
+            "link": article.get("link"),
+            "published": article.get("published"),
+            "author": article.get("author"),
+            "publisher": article.get("publisher"),
+            "description": article.get("description"),
+            "summary": article.get("summary"),
+            "keywords": article.get("keywords"),
+            "has_content": article.get("content") is not None,
+            "content_length": len(article.get("content", "")) if article.get("content") else 0
+        }
+        processed_articles.append(processed_article)
+    
+    return {
+        "articles": processed_articles,
+        "total_articles": len(processed_articles),
+        "articles_with_content": sum(1 for a in processed_articles if a.get("content"))
+    }
+
+@app.get("/debug-authors")
+def debug_authors():
+    """Debug endpoint to see what author information is available in RSS feeds"""
+    rss_feeds = {
+        "theguardian": "https://www.theguardian.com/world/rss",
+        "nytimes": "https://rss.nytimes.com/services/xml/rss/nyt/World.xml",
+        "washingtonpost": "http://feeds.washingtonpost.com/rss/world",
+        "reuters": "https://www.reuters.com/rss/worldNews",
+        "apnews": "https://apnews.com/rss/worldnews",
+        "bbc": "https://feeds.bbci.co.uk/news/world/rss.xml",
+        "cnn": "https://rss.cnn.com/rss/edition_world.rss",
+        "foxnews": "https://feeds.foxnews.com/foxnews/world",
+        "aljazeera": "https://www.aljazeera.com/xml/rss/all.xml",
+    }
+    
+    import feedparser  # only needed by this debug route
+    debug_info = {}
+    
+    for feed_name, feed_url in rss_feeds.items():
+        try:
+            feed = feedparser.parse(feed_url)
+            sample_article = feed.entries[0] if feed.entries else None
+            
+            if sample_article:
+                debug_info[feed_name] = {
+                    "has_author": hasattr(sample_article, 'author'),
+                    "has_dc_creator": hasattr(sample_article, 'dc_creator'),
+                    "has_dc_contributor": hasattr(sample_article, 'dc_contributor'),
+                    "author_value": getattr(sample_article, 'author', None),
+                    "dc_creator_value": getattr(sample_article, 'dc_creator', None),
+                    "dc_contributor_value": getattr(sample_article, 'dc_contributor', None),
+                    "available_attributes": [attr for attr in dir(sample_article) if not attr.startswith('_')]
+                }
+        except Exception as e:
+            debug_info[feed_name] = {"error": str(e)}
+    
+    return debug_info
+
+@app.get("/test-article/{url:path}")
+def test_article_extraction(url: str, refresh: bool = False):
+    """Test article metadata extraction from a specific URL (cached HTML unless refresh)"""
+    metadata = extract_article_metadata(url, refresh=refresh)
+    return {
+        "url": url,
+        "metadata": metadata
+    }
+
+@app.get("/get-articles")
+def get_articles():
+    """Get articles from database with explicit field selection"""
+    # Explicitly select all fields including content
+    articles = get_store().list()
+    
+    # Debug information
+    debug_info = {
+        "total_articles": len(articles),
+        "sample_fields": list(articles[0].keys()) if articles else [],
+        "has_content": any('content' in article for article in articles),
+        "content_values": []
+    }
+    
+    # Safely extract content values with null checking
+    if articles:
+        for article in articles[:3]:
+            content = article.get('content')
+            if content is not None:
+                debug_info["content_values"].append(content[:100] + '...')
+            else:
+                debug_info["content_values"].append('NULL_CONTENT')
+    
+    return {
+        "articles": articles,
+        "debug": debug_info
+    }
+
+@app.get("/test-content-retrieval")
+def test_content_retrieval():
+    """Test content retrieval with different approaches"""
+    store = get_store()
+    
+    # Try different approaches to retrieve content
+    results = {}
+    
+    # Approach 1: Select specific fields
+    try:
+        articles1 = store.list(["id", "title", "content"], limit=1)
+        if articles1:
+            content_value = articles1[0].get('content')
+            results["approach1"] = {
+                "success": True,
+                "data": articles1[0],
+                "content_type": type(content_value),
+                "content_value": content_value,
+                "content_is_none": content_value is None,
+                "content_length": len(content_value) if content_value is not None else 0
+            }
+        else:
+            results["approach1"] = {"success": True, "error": "No data found"}
+    except Exception as e:
+        results["approach1"] = {"success": False, "error": str(e)}
+    
+    # Approach 2: Select only content field
+    try:
+        articles2 = store.list(["content"], limit=1)
+        if articles2:
+            content_value = articles2[0].get('content')
+            results["approach2"] = {
+                "success": True,
+                "data": articles2[0],
+                "content_type": type(content_value),
+                "content_value": content_value,
+                "content_is_none": content_value is None,
+                "content_length": len(content_value) if content_value is not None else 0
+            }
+        else:
+            results["approach2"] = {"success": True, "error": "No data found"}
+    except Exception as e:
+        results["approach2"] = {"success": False, "error": str(e)}
+    
+    # Approach 3: Check raw response
+    try:
+        articles3 = store.list(limit=1)
+        if articles3:
+            sample_article = articles3[0]
+            content_value = sample_article.get('content')
+            # Create a safe version of the sample article for JSON serialization
+            safe_article = {}
+            for key, value in sample_article.items():
+                if isinstance(value, (str, int, float, bool, type(None))):
+                    safe_article[key] = value
+                else:
+                    safe_article[key] = str(value)
+            
+            results["approach3"] = {
+                "success": True,
+                "raw_response_keys": list(sample_article.keys()),
+                "content_value": content_value,
+                "content_is_null": content_value is None,
+                "content_is_empty_string": content_value == "",
+                "content_type": str(type(content_value)),
+                "content_length": len(content_value) if content_value is not None else 0,
+                "content_preview": content_value[:200] + "..." if content_value and len(content_value) > 200 else content_value,
+                "all_fields": safe_article
+            }
+        else:
+            results["approach3"] = {"success": True, "error": "No data found"}
+    except Exception as e:
+        results["approach3"] = {"success": False, "error": str(e)}
+    
+    return results
+
+@app.get("/check-table-schema")
+def check_table_schema():
+    """Check the schema of the data table"""
+    store = get_store()
+    
+    try:
+        # Try to get table information by selecting a single row
+        result = store.list(limit=1)
+        
+        if result:
+            sample_row = result[0]
+            content_value = sample_row.get("content")
+            # Create a safe version of the sample row for JSON serialization
+            safe_row = {}
+            for key, value in sample_row.items():
+                if isinstance(value, (str, int, float, bool, type(None))):
+                    safe_row[key] = value
+                else:
+                    safe_row[key] = str(value)
+            
+            schema_info = {
+                "backend": store.name,
+                "columns": store.columns(),
+                "has_content_column": "content" in sample_row,
+                "content_column_type": str(type(content_value)),
+                "content_column_value": content_value,
+                "content_is_null": content_value is None,
+                "content_is_empty_string": content_value == "",
+                "content_length": len(content_value) if content_value is not None else 0,
+                "sample_row": safe_row
+            }
+        else:
+            schema_info = {"error": "No data in table"}
+            
+        return schema_info
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.get("/test-insert-content")
+def test_insert_content():
+    """Test inserting content directly to see if the column exists"""
+    try:
+        # Try to insert a test record with content
+        test_data = {
+            "title": "Test Article",
+            "content": "This is a test content to verify the content column exists and works.",
+            "link": "https://test.com",
+            "published": "2024-01-01"
+        }
+        
+        inserted = get_store().insert(test_data)
+        
+        if inserted:
+            return {
+                "success": True,
+                "inserted_data": inserted,
+                "has_content": "content" in inserted,
+                "content_value": inserted.get("content")
+            }
+        else:
+            return {"success": False, "error": "No data returned from insert"}
+            
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@app.get("/test-convert-function")
+def test_convert_function():
+    """Test what the JSON conversion (json_safe) does to content"""
+    test_data = {
+        "title": "Test Article",
+        "content": "This is test content with some text.",
+        "published": "2024-01-01",
+        "keywords": ["test", "content"]
+    }
+    
+    print(f"Original content: {test_data['content']} - Type: {type(test_data['content'])}")
+    
+    converted_data = json_safe(test_data)
+    
+    print(f"Converted content: {converted_data['content']} - Type: {type(converted_data['content'])}")
+    
+    return {
+        "original": test_data,
+        "converted": converted_data,
+        "content_changed": test_data['content'] != converted_data['content']
+    }
+
+@app.get("/test-metadata-extraction")
+def test_metadata_extraction():
+    """Test metadata extraction to see what non-serializable objects are returned"""
+    url = "https://ithacavoice.org/2025/07/weather-hazy-hot-and-humid-to-start-the-week-cooler-later/"
+    
+    try:
+        metadata = extract_article_metadata(url)
+        
+        if metadata:
+            # Check for non-serializable objects
+            problematic_keys = []
+            for key, value in metadata.items():
+                if callable(value) or hasattr(value, '__dict__'):
+                    problematic_keys.append(key)
+            
+            return {
+                "success": True,
+                "metadata_keys": list(metadata.keys()),
+                "problematic_keys": problematic_keys,
+                "content_type": type(metadata.get('content')),
+                "content_length": len(metadata.get('content', '')) if metadata.get('content') else 0,
+                "cleaned_metadata": json_safe(metadata)
+            }
+        else:
+            return {"success": False, "error": "No metadata returned"}
+            
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@app.get("/debug-supabase-response")
+def debug_supabase_response():
+    """Debug what the article store is actually returning"""
+    try:
+        # Get the most recent article
+        result = get_store().list(limit=1)
+        
+        if result:
+            article = result[0]
+            
+            # Check the raw response
+            debug_info = {
+                "raw_article": article,
+                "has_content_field": "content" in article,
+                "content_value": article.get("content"),
+                "content_type": str(type(article.get("content"))),
+                "content_is_none": article.get("content") is None,
+                "content_is_empty": article.get("content") == "",
+                "content_length": len(article.get("content", "")) if article.get("content") else 0,
+                "all_fields": list(article.keys()),
+                "sample_content_preview": article.get("content", "")[:200] + "..." if article.get("content") and len(article.get("content", "")) > 200 else article.get("content", "")
+            }
+            
+            return debug_info
+        else:
+            return {"error": "No articles found"}
+            
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.get("/get-articles-with-content")
+def get_articles_with_content():
+    """Get articles with explicit content field selection"""
+    try:
+        # Explicitly select content field
+        result = get_store().list(["id", "title", "content", "link", "published", "author"], limit=5)
+        
+        articles = []
+        for article in result:
+            # Ensure content is included
+            article_with_content = {
+                "id": article.get("id"),
+                "title": article.get("title"),
+                "content": article.get("content"),
+                "link": article.get("link"),
+                "published": article.get("published"),
+                "author": article.get("author"),
+                "has_content": article.get("content") is not None,
+                "content_length": len(article.get("content", "")) if article.get("content") else 0
+            }
+            articles.append(article_with_content)
+        
+        return {
+            "articles": articles,
+            "total_articles": len(articles),
+            "articles_with_content": sum(1 for a in articles if a.get("content"))
+        }
+        
+    except Exception as e:
+        return {"error": str(e)}
@@ -0,0 +1,120 @@
+"""In-process article cache used by the Gradio UI"""
+import os
+import threading
+import time
+
+
+def _recency(article):
+    return article.get("created_at") or "", article.get("id") or 0
+
+
+def merge_articles(articles, changed, max_articles):
+    """Newest-first articles with changed ones replaced in place or added by id"""
+    changed_by_id = {article["id"]: article for article in changed}
+    merged = [changed_by_id.pop(article["id"], article) for article in articles]
+    added = sorted(changed_by_id.values(), key=_recency, reverse=True)
+    if added and merged and _recency(added[-1]) < _recency(merged[0]):
+        # Not all newer than what we have (e.g. an old article was updated)
+        return sorted(added + merged, key=_recency, reverse=True)[:max_articles]
+    return (added + merged)[:max_articles]
+
+
+class ArticleCache:
+    """Holds the newest articles in memory so UI events don't refetch the archive
+
+    loader(max_articles) returns a list of articles, newest first. The cache
+    reloads when its TTL expires or after invalidate() (called when a poll
+    finishes, or with full=True by the refresh button). If a reload fails while older data
+    is available, the stale articles keep being served. on_reload(articles)
+    runs after every successful load so derived indexes can follow along.
+
+    With changes(since), reloads only fetch what was written since the last
+    load and merge it in by id. changes(None) returns ([], position) for the
+    current position; changes(position) returns (articles, new position), or
+    None when everything has to be reloaded. Whatever the changes missed is
+    picked up by a full reload every full_reload seconds, or on
+    invalidate(full=True).
+    """
+
+    def __init__(self, loader, ttl=None, max_articles=None, on_reload=None, changes=None, full_reload=None):
+        if ttl is None:
+            ttl = float(os.getenv("ARTICLE_CACHE_TTL", "300"))
+        if max_articles is None:
+            max_articles = int(os.getenv("ARTICLE_CACHE_MAX", "5000"))
+        if full_reload is None:
+            full_reload = float(os.getenv("ARTICLE_CACHE_FULL_RELOAD", "3600"))
+        self.loader = loader
+        self.changes = changes
+        self.on_reload = on_reload
+        self.ttl = ttl
+        self.max_articles = max(1, max_articles)
+        self.full_reload = full_reload
+        self._articles = None
+        self._since = None
+        self._loaded_at = 0.0
+        self._full_loaded_at = 0.0
+        self._full = False
+        self._version = 0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def _is_fresh(self):
+        return self._articles is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def get_articles(self):
+        """Return cached articles, reloading them first if stale"""
+        with self._lock:
+            if self._is_fresh():
+                return self._articles
+            version = self._version
+
+        # Only one caller reloads; the others wait and reuse its result
+        with self._load_lock:
+            with self._lock:
+                if self._is_fresh():
+                    return self._articles
+            try:
+                articles, since = self._load()
+            except Exception as e:
+                with self._lock:
+                    if self._articles is None:
+                        raise
+                    print(f"Article cache reload failed, serving stale articles: {e}")
+                    return self._articles
+            if self.on_reload is not None:
+                self.on_reload(articles)
+            with self._lock:
+                self._articles = articles
+                self._since = since
+                # An invalidate() during the load leaves the new data already stale
+                self._loaded_at = time.monotonic() if self._version == version else 0.0
+                return articles
+
+    def _load(self):
+        # Called with the load lock held, which also guards _articles and _since writes
+        with self._lock:
+            full, self._full = self._full, False
+        if (self.changes is not None and self._articles is not None and self._since is not None and not full
+                and time.monotonic() - self._full_loaded_at < self.full_reload):
+            result = self.changes(self._since)
+            if result is not None:
+                changed, since = result
+                return merge_articles(self._articles, changed, self.max_articles), since
+        try:
+            # Take the position first: anything written during the load comes again as a change
+            since = self.changes(None)[1] if self.changes is not None else None
+            articles = self.loader(self.max_articles)[:self.max_articles]
+        except Exception:
+            with self._lock:
+                self._full = self._full or full
+            raise
+        self._full_loaded_at = time.monotonic()
+        return articles, since
+
+    def invalidate(self, full=False):
+        """Force the next get_articles() to reload; full=True reloads everything instead of just the changes"""
+        with self._lock:
+            self._version += 1
+            self._loaded_at = 0.0
+            if full:
+                self._full = True
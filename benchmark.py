@@ -0,0 +1,596 @@
+"""Offline benchmark of the ingest pipeline and the UI's search and listing
+
+Feeds and article pages for the ten configured sources are served from a
+local fixture server: either synthetic documents, or ones recorded earlier
+with --record. Rows go to an in-memory stand-in store, so neither the news
+sites nor Supabase are contacted. The UI stages run against synthetic
+archives of each --sizes size.
+
+    python benchmark.py                          # synthetic fixtures, 1k..1M archives
+    python benchmark.py --record fixtures        # record the live feeds once
+    python benchmark.py --fixtures fixtures --sizes 1000,10000
+
+Every stage reports throughput and p50/p99 latency; the full results are
+written as JSON (--output) so runs can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+from storage import COLUMNS, ArticleStore
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+ENTRIES_PER_FEED = 20
+SENTENCE_POOL = 5_000
+VOCABULARY = 20_000
+# Cold import budget per entry point; restarts and new workers pay this every time
+IMPORT_BUDGETS_MS = {"api": 1000, "worker": 500, "ui": 500}
+# Libraries that should only load once a poll, extraction or the interface needs them
+HEAVY_MODULES = ("gradio", "newspaper", "nltk", "lxml", "feedparser", "supabase")
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, max(0, round(fraction * len(sorted_samples) + 0.5) - 1))
+    return sorted_samples[index]
+
+
+def summarize(stage, samples, items=None, archive_size=None, **extra):
+    """Result record for one stage: samples are seconds per operation"""
+    ordered = sorted(samples)
+    total = sum(ordered)
+    items = len(ordered) if items is None else items
+    record = {
+        "stage": stage,
+        "archive_size": archive_size,
+        "operations": len(ordered),
+        "items": items,
+        "total_seconds": round(total, 6),
+        "throughput_per_second": round(items / total, 3) if total else None,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4) if ordered else None,
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4) if ordered else None,
+        "mean_ms": round(total / len(ordered) * 1000, 4) if ordered else None,
+        "max_ms": round(ordered[-1] * 1000, 4) if ordered else None
+    }
+    record.update(extra)
+    return record
+
+
+def timed(function, *args, **kwargs):
+    """(seconds, result) of one call"""
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def timed_attempt(function, *args, **kwargs):
+    """(seconds, result) of one call that may fail; result is None if it raised"""
+    started = time.perf_counter()
+    try:
+        result = function(*args, **kwargs)
+    except Exception as e:
+        print(f"{function.__name__} failed: {e}")
+        result = None
+    return time.perf_counter() - started, result
+
+
+class MemoryStore(ArticleStore):
+    """Stand-in article store that keeps rows in a dict, optionally with simulated latency"""
+
+    name = "memory"
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.rows = {}
+        self.upserts = 0
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def upsert(self, rows, on_conflict="link"):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.upserts += 1
+            for row in rows:
+                key = row.get(on_conflict)
+                existing = self.rows.get(key)
+                if existing is None:
+                    existing = {"id": self._next_id, "created_at": datetime.now(timezone.utc).isoformat()}
+                    self._next_id += 1
+                self.rows[key] = {**existing, **row}
+
+    def insert(self, row):
+        self.upsert([row])
+        return self.rows[row.get("link")]
+
+    def list(self, columns=None, limit=None, after=None, publisher=None, search=None):
+        with self._lock:
+            rows = sorted(self.rows.values(), key=lambda row: (row["created_at"], row["id"]), reverse=True)
+        if publisher:
+            rows = [row for row in rows if row.get("publisher") == publisher]
+        if search:
+            needle = search.lower()
+            rows = [row for row in rows
+                    if any(needle in (row.get(field) or "").lower() for field in ("title", "description", "content"))]
+        if after:
+            rows = [row for row in rows if (row["created_at"], row["id"]) < tuple(after)]
+        rows = rows[:limit] if limit is not None else rows
+        return [{column: row.get(column) for column in columns} for row in rows] if columns else rows
+
+    def columns(self):
+        return list(COLUMNS)
+
+    def version(self):
+        return str(self.upserts)
+
+
+class TextGenerator:
+    """Deterministic pseudo-English: a Zipf-weighted vocabulary and a pool of sentences"""
+
+    def __init__(self, seed=0):
+        self.random = random.Random(seed)
+        syllables = ["ca", "yu", "ga", "it", "ha", "ton", "lake", "cor", "nell", "ri", "ver", "mon",
+                     "den", "sel", "ar", "bor", "vel", "tin", "ex", "pro", "ma", "sto", "quin", "li"]
+        words = set()
+        while len(words) < VOCABULARY:
+            words.add("".join(self.random.choice(syllables) for _ in range(self.random.randint(1, 4))))
+        self.words = sorted(words, key=lambda word: self.random.random())
+        weights = [1 / rank for rank in range(1, len(self.words) + 1)]
+        self.sentences = [
+            " ".join(self.random.choices(self.words, weights, k=self.random.randint(8, 18))).capitalize() + "."
+            for _ in range(SENTENCE_POOL)
+        ]
+
+    def title(self):
+        return " ".join(self.random.choice(self.words[:2000]) for _ in range(self.random.randint(4, 9))).title()
+
+    def paragraph(self, sentences=4):
+        return " ".join(self.random.choice(self.sentences) for _ in range(sentences))
+
+
+def synthetic_fixtures(base_url, entries_per_feed=ENTRIES_PER_FEED, seed=0):
+    """RSS documents and article pages for the configured feeds: {path: (content type, bytes)}"""
+    from feeds import RSS_FEEDS
+    text = TextGenerator(seed)
+    now = datetime(2025, 7, 1, tzinfo=timezone.utc)
+    documents = {}
+    for feed_name in RSS_FEEDS:
+        items = []
+        for i in range(entries_per_feed):
+            path = f"/articles/{feed_name}/{i}.html"
+            title = text.title()
+            published = now - timedelta(hours=i * 3)
+            author = f"{text.title().split()[0]} {text.title().split()[0]}"
+            body = "".join(f"<p>{text.paragraph()}</p>" for _ in range(text.random.randint(5, 12)))
+            documents[path] = ("text/html", f"""<!DOCTYPE html><html><head><title>{title}</title>
+<meta property="og:site_name" content="{feed_name}"><meta name="author" content="{author}">
+<meta property="article:published_time" content="{published.isoformat()}"></head>
+<body><nav><a href="/">Home</a></nav><article><h1>{title}</h1>{body}</article><footer>{feed_name}</footer></body></html>""".encode())
+            items.append(f"""<item><title>{title}</title><link>{base_url}{path}</link>
+<description>{text.paragraph(2)}</description><author>{author}</author>
+<pubDate>{format_datetime(published)}</pubDate><guid>{base_url}{path}</guid></item>""")
+        documents[f"/feeds/{feed_name}"] = ("application/rss+xml", f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>{feed_name}</title><link>{base_url}/</link>
+<description>Synthetic {feed_name} feed</description>{"".join(items)}</channel></rss>""".encode())
+    return documents
+
+
+def record_fixtures(directory, entries_per_feed=ENTRIES_PER_FEED):
+    """Download the live feeds and up to entries_per_feed article pages each into directory"""
+    import feedparser
+    import requests
+    from feeds import RSS_FEEDS, USER_AGENT
+
+    os.makedirs(os.path.join(directory, "articles"), exist_ok=True)
+    manifest = {"recorded_at": datetime.now(timezone.utc).isoformat(), "feeds": {}, "articles": {}}
+    headers = {"User-Agent": USER_AGENT}
+    for feed_name, feed_url in RSS_FEEDS.items():
+        try:
+            response = requests.get(feed_url, headers=headers, timeout=30)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"Could not record {feed_name}: {e}")
+            continue
+        with open(os.path.join(directory, f"{feed_name}.xml"), "wb") as f:
+            f.write(response.content)
+        manifest["feeds"][feed_name] = {"url": feed_url, "file": f"{feed_name}.xml"}
+        for i, entry in enumerate(feedparser.parse(response.content).entries[:entries_per_feed]):
+            link = entry.get("link")
+            if not link or link in manifest["articles"]:
+                continue
+            try:
+                page = requests.get(link, headers=headers, timeout=30)
+                page.raise_for_status()
+            except Exception as e:
+                print(f"Could not record {link}: {e}")
+                continue
+            filename = f"articles/{feed_name}-{i}.html"
+            with open(os.path.join(directory, filename), "wb") as f:
+                f.write(page.content)
+            manifest["articles"][link] = filename
+        print(f"Recorded {feed_name}")
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def recorded_fixtures(directory, base_url):
+    """Fixtures saved by record_fixtures, with article links pointed at the fixture server"""
+    with open(os.path.join(directory, "manifest.json")) as f:
+        manifest = json.load(f)
+    documents = {}
+    replacements = {}
+    for link, filename in manifest["articles"].items():
+        path = "/" + quote(filename)
+        with open(os.path.join(directory, filename), "rb") as f:
+            documents[path] = ("text/html", f.read())
+        replacements[link] = base_url + path
+        replacements[link.replace("&", "&amp;")] = base_url + path
+    for feed_name, feed in manifest["feeds"].items():
+        with open(os.path.join(directory, feed["file"]), "rb") as f:
+            xml = f.read().decode("utf-8", errors="replace")
+        # Longest first so a link that prefixes another is not rewritten half way
+        for link in sorted(replacements, key=len, reverse=True):
+            xml = xml.replace(link, replacements[link])
+        documents[f"/feeds/{feed_name}"] = ("application/rss+xml", xml.encode())
+    return documents
+
+
+class FixtureServer:
+    """Serves fixture documents on localhost, optionally with added per-response latency"""
+
+    def __init__(self, latency=0.0):
+        self.documents = {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                document = server.documents.get(self.path)
+                if server.latency:
+                    time.sleep(server.latency)
+                if document is None:
+                    self.send_error(404)
+                    return
+                content_type, body = document
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.latency = latency
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="fixture-server", daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def feeds(self):
+        """{feed_name: fixture URL} for every feed being served"""
+        return {path.rsplit("/", 1)[1]: self.base_url + path for path in self.documents if path.startswith("/feeds/")}
+
+
+def benchmark_ingest(server, store, repeat):
+    """Per-stage latency of the poll pipeline, then end-to-end poll throughput
+
+    Every stage also reports how many of its items failed ("failed"): timings
+    of a pipeline that did not extract anything mean nothing.
+    """
+    import feedparser
+    import ingest
+    import storage
+    from extraction import build_article_data, fetch_article_html, parse_article_html
+    from feeds import fetch_feed
+    from near_duplicates import minhash_signature
+    from records import dumps
+
+    feeds = server.feeds()
+    results = []
+
+    fetch_samples, parse_samples, entries = [], [], []
+    fetch_failed = 0
+    for round_number in range(repeat):
+        for feed_name, feed_url in feeds.items():
+            seconds, (feed_entries, stats) = timed(fetch_feed, feed_name, feed_url)
+            fetch_samples.append(seconds)
+            fetch_failed += "error" in stats
+            if round_number == 0:
+                entries.extend(feed_entries)
+            body = server.documents[feed_url[len(server.base_url):]][1]
+            parse_samples.append(timed(feedparser.parse, body)[0])
+    results.append(summarize("feed_fetch", fetch_samples, failed=fetch_failed))
+    results.append(summarize("feed_parse", parse_samples))
+
+    # The same calls a poll makes: download through the HTML cache, then parse
+    download_samples, cache_samples, parse_samples, build_samples, rows = [], [], [], [], []
+    download_failed = cache_failed = parse_failed = 0
+    for entry in entries:
+        seconds, html = timed_attempt(fetch_article_html, entry.link, refresh=True)
+        download_samples.append(seconds)
+        download_failed += not html
+        # Re-extraction reads the page back from the cache
+        seconds, cached = timed_attempt(fetch_article_html, entry.link, offline=True)
+        cache_samples.append(seconds)
+        cache_failed += not cached
+        metadata = None
+        if html:
+            seconds, metadata = timed_attempt(parse_article_html, entry.link, html)
+            parse_samples.append(seconds)
+        parse_failed += metadata is None
+        seconds, row = timed(build_article_data, entry, metadata)
+        build_samples.append(seconds)
+        rows.append(row)
+    results.append(summarize("article_download", download_samples, failed=download_failed))
+    results.append(summarize("article_cache_read", cache_samples, failed=cache_failed))
+    results.append(summarize("article_parse", parse_samples, failed=parse_failed))
+    results.append(summarize("build_row", build_samples))
+    samples = [timed(dumps, rows[start:start + 50])[0] for start in range(0, len(rows), 50)]
+    results.append(summarize("serialize_rows", samples, items=len(rows)))
+    samples = [timed(minhash_signature, row["content"])[0] for row in rows]
+    results.append(summarize("minhash_signature", samples))
+
+    # One upsert per batch, as ArticleWriter sends them
+    batch_size = int(os.getenv("DB_BATCH_SIZE", "100"))
+    write_samples = [timed(store.upsert, rows[start:start + batch_size])[0] for start in range(0, len(rows), batch_size)]
+    results.append(summarize("store_write", write_samples, items=len(rows), batch_size=batch_size))
+
+    # Whole polls through ingest_feeds, forced so every entry is re-extracted
+    storage._store = store
+    poll_samples, inserted = [], 0
+    poll_failed = []
+
+    def count_failures(stage, info):
+        if stage == "extract" and not info["extracted"]:
+            poll_failed.append(info["link"])
+
+    for _ in range(repeat):
+        seconds, result = timed(ingest.ingest_feeds, feeds, force=True, progress=count_failures)
+        poll_samples.append(seconds)
+        inserted += result["articles_inserted"]
+        poll_failed.extend([None] * result.get("articles_deferred", 0))
+    results.append(summarize("poll", poll_samples, items=inserted, feeds=len(feeds), failed=len(poll_failed)))
+    return results
+
+
+def synthetic_archive(size, seed=1):
+    """size articles shaped like the UI cache (CACHE_FIELDS), newest first"""
+    from feeds import RSS_FEEDS
+    text = TextGenerator(seed)
+    publishers = list(RSS_FEEDS)
+    start = datetime(2025, 7, 1, tzinfo=timezone.utc)
+    articles = []
+    for i in range(size):
+        content = text.paragraph(text.random.randint(3, 8))
+        articles.append({
+            "id": size - i,
+            "title": text.title(),
+            "content": content,
+            "description": content,
+            "link": f"https://example.org/{size - i}",
+            "published": (start - timedelta(minutes=i)).isoformat(),
+            "author": "Staff",
+            "publisher": publishers[i % len(publishers)],
+            "created_at": (start - timedelta(minutes=i)).isoformat()
+        })
+    return articles, text
+
+
+def benchmark_ui(size, queries):
+    """Index build, filter_articles and display_articles over a synthetic archive"""
+    import ui
+    from article_cache import ArticleCache
+
+    articles, text = synthetic_archive(size)
+    results = []
+
+    ui.search_index = ui.SearchIndex()
+    ui.publisher_facets = ui.FacetIndex("publisher")
+    seconds, _ = timed(ui.index_articles, articles)
+    results.append(summarize("index_build", [seconds], items=size, archive_size=size))
+
+    words = text.words
+    query_sets = {
+        "search_common": [words[i] for i in range(queries)],
+        "search_rare": [words[5000 + i] for i in range(queries)],
+        "search_two_terms": [f"{words[i]} {words[i + 1]}" for i in range(queries)],
+        "search_prefix": [words[i][:3] for i in range(queries)]
+    }
+    publishers = [article["publisher"] for article in articles[:10]]
+    for stage, query_list in query_sets.items():
+        samples = [timed(ui.filter_articles, articles, query, "All Publishers")[0] for query in query_list]
+        results.append(summarize(stage, samples, archive_size=size))
+    samples = [timed(ui.filter_articles, articles, "", publishers[i % len(publishers)])[0] for i in range(queries)]
+    results.append(summarize("publisher_filter", samples, archive_size=size))
+    samples = [timed(ui.filter_articles, articles, words[i], publishers[i % len(publishers)])[0] for i in range(queries)]
+    results.append(summarize("search_and_publisher", samples, archive_size=size))
+
+    # display_articles reads the module-level cache; serve the synthetic archive from it
+    ui.article_cache = ArticleCache(lambda max_articles: articles, ttl=3600, max_articles=size,
+                                      on_reload=lambda loaded: None)
+    ui.article_cache.get_articles()
+    ui.article_cards = ui.CardCache(ui.create_article_card)
+    pages = max(1, size // ui.ARTICLES_PER_PAGE)
+    samples = [timed(ui.display_articles, "", "All Publishers", 1 + (i * 7919) % pages)[0] for i in range(queries)]
+    results.append(summarize("display_articles", samples, archive_size=size))
+    # The same pages again, as when paging back and forth (cards come from the card cache)
+    samples = [timed(ui.display_articles, "", "All Publishers", 1 + (i * 7919) % pages)[0] for i in range(queries)]
+    results.append(summarize("display_articles_revisit", samples, archive_size=size))
+    samples = [timed(ui.display_articles, words[i], "All Publishers", 2)[0] for i in range(queries)]
+    results.append(summarize("display_articles_search", samples, archive_size=size))
+    return results
+
+
+def benchmark_sqlite(size, queries):
+    """Bulk load and keyset-paginated listing from the SQLite store"""
+    from storage import SQLiteStore
+
+    articles, text = synthetic_archive(size)
+    store = SQLiteStore(f"bench-{size}.sqlite3")
+    results = []
+    load_samples = []
+    for start in range(0, size, 1000):
+        batch = [{key: value for key, value in article.items() if key != "id"} for article in articles[start:start + 1000]]
+        load_samples.append(timed(store.upsert, batch)[0])
+    results.append(summarize("sqlite_load", load_samples, items=size, archive_size=size))
+
+    columns = ["id", "title", "created_at", "publisher"]
+    samples, after = [], None
+    for _ in range(queries):
+        seconds, rows = timed(store.list, columns, limit=50, after=after)
+        samples.append(seconds)
+        after = (rows[-1]["created_at"], rows[-1]["id"]) if len(rows) == 50 else None
+    results.append(summarize("sqlite_list_page", samples, items=50 * len(samples), archive_size=size))
+    samples = [timed(store.list, columns, limit=50, search=text.words[i])[0] for i in range(queries)]
+    results.append(summarize("sqlite_search_page", samples, archive_size=size))
+
+    # The /list endpoint end to end (query, projection, JSON encoding) on this store
+    import api
+    import storage
+    from fastapi.testclient import TestClient
+    storage._store = store
+    client = TestClient(api.app)
+    for stage, params in (("list_endpoint", {"limit": 50}), ("list_endpoint_excerpt", {"limit": 50, "fields": "id,title,excerpt,publisher"})):
+        samples = [timed(client.get, "/list", params=params)[0] for _ in range(queries)]
+        results.append(summarize(stage, samples, items=50 * len(samples), archive_size=size))
+    storage._store = None
+    store.close()
+    return results
+
+
+def benchmark_imports(repeat):
+    """Cold import time of each entry point, each sample in a fresh interpreter"""
+    script = ("import sys, time; started = time.perf_counter(); import {module}; "
+              "print(time.perf_counter() - started); print(','.join(m for m in {heavy!r} if m in sys.modules))")
+    results = []
+    for module, budget_ms in IMPORT_BUDGETS_MS.items():
+        samples = []
+        for _ in range(max(1, repeat)):
+            output = subprocess.run(
+                [sys.executable, "-c", script.format(module=module, heavy=HEAVY_MODULES)],
+                capture_output=True, text=True, check=True,
+                cwd=os.path.dirname(os.path.abspath(__file__)), env={**os.environ, "POLL_SCHEDULER": "0"}
+            ).stdout.splitlines()
+            samples.append(float(output[0]))
+            heavy = [name for name in output[1].split(",") if name] if len(output) > 1 else []
+        record = summarize(f"import_{module}", samples, budget_ms=budget_ms, heavy_modules=heavy)
+        record["within_budget"] = record["p50_ms"] <= budget_ms
+        if not record["within_budget"]:
+            print(f"Importing {module} takes {record['p50_ms']:.0f} ms, over its {budget_ms} ms budget")
+        if heavy:
+            print(f"Importing {module} loads {', '.join(heavy)}")
+        results.append(record)
+    return results
+
+
+def environment():
+    """What the numbers were measured on"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": commit
+    }
+
+
+def print_results(results):
+    print(f"{'stage':<26}{'archive':>10}{'ops':>7}{'items/s':>14}{'p50 ms':>11}{'p99 ms':>11}")
+    for record in results:
+        size = record["archive_size"] if record["archive_size"] is not None else "-"
+        throughput = record["throughput_per_second"] if record["throughput_per_second"] is not None else "-"
+        print(f"{record['stage']:<26}{size:>10}{record['operations']:>7}{throughput:>14}"
+              f"{record['p50_ms']:>11}{record['p99_ms']:>11}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--record", metavar="DIR", help="record the live feeds and articles into DIR, then exit")
+    parser.add_argument("--fixtures", metavar="DIR", help="replay fixtures recorded with --record instead of synthetic ones")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma separated synthetic archive sizes for the UI stages")
+    parser.add_argument("--repeat", type=int, default=3, help="polls (and feed fetch rounds) to time")
+    parser.add_argument("--queries", type=int, default=50, help="operations per UI stage and archive size")
+    parser.add_argument("--network-latency-ms", type=float, default=0, help="delay added to every fixture response")
+    parser.add_argument("--store-latency-ms", type=float, default=0, help="delay added to every stand-in store upsert")
+    parser.add_argument("--sqlite", action="store_true", help="also benchmark the SQLite store and /list at each archive size")
+    parser.add_argument("--skip-ingest", action="store_true", help="only run the archive-size stages")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON results")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record_fixtures(args.record)
+        return 0
+
+    # Keep feed caches, seen entries and SQLite files away from the real state
+    os.environ["STATE_DIR"] = tempfile.mkdtemp(prefix="newschat-bench-")
+    os.environ.setdefault("POLL_SCHEDULER", "0")
+    # Every fixture is served from one local host; don't rate limit it
+    os.environ.setdefault("FETCH_HOST_RATE", "0")
+    os.environ.setdefault("FETCH_HOST_CONCURRENCY", "0")
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    report = {"environment": environment(), "settings": vars(args), "results": []}
+    report["results"] += benchmark_imports(args.repeat)
+
+    if not args.skip_ingest:
+        with FixtureServer(latency=args.network_latency_ms / 1000) as server:
+            if args.fixtures:
+                server.documents = recorded_fixtures(args.fixtures, server.base_url)
+            else:
+                server.documents = synthetic_fixtures(server.base_url)
+            store = MemoryStore(latency=args.store_latency_ms / 1000)
+            report["results"] += benchmark_ingest(server, store, args.repeat)
+            report["stored_rows"] = len(store.rows)
+            report["failures"] = {record["stage"]: record["failed"]
+                                  for record in report["results"] if record.get("failed")}
+
+    for size in sizes:
+        print(f"Archive of {size} articles...")
+        report["results"] += benchmark_ui(size, args.queries)
+        if args.sqlite:
+            report["results"] += benchmark_sqlite(size, args.queries)
+
+    from extraction import shutdown_parse_pool
+    shutdown_parse_pool()
+
+    print_results(report["results"])
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    if report.get("failures"):
+        # Fixtures are served locally, every one of them should go through
+        failed = ", ".join(f"{stage}: {count}" for stage, count in report["failures"].items())
+        print(f"Fixture articles failed ({failed})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""Rendered article cards kept between UI renders"""
+import os
+import threading
+from collections import OrderedDict
+
+# What a card shows; a card is rendered again only when one of these changes
+CARD_FIELDS = ("title", "excerpt", "content", "link", "author", "publisher", "published", "also_covered_by")
+
+
+class CardCache:
+    """Card HTML per article id, oldest rendered cards dropped first
+
+    render(article) builds the HTML. Filtering and paging show the same
+    articles over and over, so each card (and its excerpt) is rendered once
+    and reused until the article changes: the article cache hands out the
+    same dict for an unchanged article, and a new one (compared on the
+    fields a card shows) when it was reloaded or updated.
+    """
+
+    def __init__(self, render, max_cards=None):
+        if max_cards is None:
+            max_cards = int(os.getenv("CARD_CACHE_MAX", "5000"))
+        self.render = render
+        self.max_cards = max(1, max_cards)
+        self._cards = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, article):
+        """Card HTML for an article, rendered only on the first request or after a change"""
+        key = article.get("id")
+        if key is None:
+            return self.render(article)
+        # Reads need no lock: a dict lookup is atomic and entries are replaced, never mutated
+        cached = self._cards.get(key)
+        if cached is not None:
+            previous, html = cached
+            if previous is article:
+                return html
+            if all(previous.get(field) == article.get(field) for field in CARD_FIELDS):
+                self._cards[key] = (article, html)
+                return html
+        html = self.render(article)
+        with self._lock:
+            self._cards[key] = (article, html)
+            # Drop the cards rendered longest ago
+            while len(self._cards) > self.max_cards:
+                self._cards.popitem(last=False)
+        return html
+
+    def __len__(self):
+        return len(self._cards)
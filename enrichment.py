@@ -0,0 +1,207 @@
+"""Deferred NLP enrichment: summaries and keywords for stored articles, off the ingest path"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import state
+
+# Same as newspaper's Article.nlp()
+MAX_SUMMARY_SENTENCES = 5
+
+
+def _lower_priority():
+    # Enrichment can wait; polls and API requests go first
+    if hasattr(os, "nice"):
+        os.nice(10)
+
+
+def enrich_text(title, text):
+    """(summary, keywords) of an article's text, as newspaper's Article.nlp() computes them
+
+    Runs inside the enrichment process pool. Raises LookupError when NLTK's
+    sentence tokenizer data is not installed.
+    """
+    from newspaper import nlp
+    nlp.load_stopwords("en")
+    keywords = list(set(nlp.keywords(title or "").keys()) | set(nlp.keywords(text).keys()))
+    summary = "\n".join(nlp.summarize(title=title or "", text=text, max_sents=MAX_SUMMARY_SENTENCES))
+    return summary, keywords
+
+
+class Enricher:
+    """Fills in summary and keywords of stored articles in the background
+
+    Ingest stores articles without them (computing them inline would make
+    polls several times slower). This stage walks the rows whose summary is
+    still missing in id order, batch_size at a time, runs the NLP in a
+    low-priority process pool and writes the results back onto the rows by id.
+    The last id done is checkpointed in STATE_DIR, so a restart resumes
+    where it left off; after a full pass it starts over from the beginning
+    to pick up rows whose text was re-ingested. A row the NLP can't handle
+    gets an empty summary so it is not retried forever.
+    """
+
+    def __init__(self, store=None, batch_size=None, workers=None, interval=None,
+                 filename="enrichment.sqlite3"):
+        if batch_size is None:
+            batch_size = int(os.getenv("ENRICH_BATCH_SIZE", "20"))
+        if workers is None:
+            workers = int(os.getenv("ENRICH_WORKERS", "0")) or max(1, (os.cpu_count() or 2) // 2)
+        if interval is None:
+            interval = float(os.getenv("ENRICH_INTERVAL", "300"))
+        self._store = store
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        self.interval = interval
+        self.enriched = 0
+        self.failed = 0
+        self.last_error = None
+        self._pool = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._conn = state.connect(filename)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints (name TEXT PRIMARY KEY, last_id INTEGER NOT NULL, updated_at REAL)"
+            )
+
+    @property
+    def store(self):
+        if self._store is None:
+            from storage import get_store
+            self._store = get_store()
+        return self._store
+
+    def _checkpoint(self):
+        with self._lock:
+            row = self._conn.execute("SELECT last_id FROM checkpoints WHERE name = 'summary'").fetchone()
+            return row[0] if row else 0
+
+    def _save_checkpoint(self, last_id):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (name, last_id, updated_at) VALUES ('summary', ?, ?)",
+                (last_id, time.time())
+            )
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn like the parse pool: this process has live threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_lower_priority
+            )
+        return self._pool
+
+    def run_batch(self):
+        """Enrich the next batch after the checkpoint; returns rows handled, 0 at the end of a pass"""
+        after_id = self._checkpoint()
+        rows = self.store.without_summary(["id", "title", "content"], limit=self.batch_size, after_id=after_id)
+        if not rows:
+            self._save_checkpoint(0)
+            return 0
+        pool = self._get_pool()
+        futures = [pool.submit(enrich_text, row.get("title"), row["content"]) for row in rows]
+        for row, future in zip(rows, futures):
+            try:
+                summary, keywords = future.result()
+                self.enriched += 1
+            except LookupError as e:
+                # NLTK data missing: nothing will work, stop without touching the rows
+                for pending in futures:
+                    pending.cancel()
+                raise RuntimeError(
+                    "NLTK sentence tokenizer data is missing, install it with "
+                    "`python -m nltk.downloader punkt_tab`") from e
+            except Exception as e:
+                print(f"Error enriching article {row.get('id')}: {e}")
+                summary, keywords = "", []
+                self.failed += 1
+            # By id: a row without a link must not turn into an upserted blank row
+            self.store.update(row["id"], {"summary": summary, "keywords": keywords})
+        self._save_checkpoint(rows[-1]["id"])
+        return len(rows)
+
+    def run_pass(self):
+        """Enrich batches until every row has a summary; returns rows handled"""
+        handled = 0
+        while not self._stop.is_set():
+            count = self.run_batch()
+            if not count:
+                break
+            handled += count
+        return handled
+
+    def wake(self):
+        """Start a pass now instead of at the next interval (e.g. after a poll wrote rows)"""
+        self._wake.set()
+
+    def start(self):
+        """Run passes in a background thread: every interval seconds, or when woken"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="enricher", daemon=True)
+            self._thread.start()
+        print(f"Enrichment started with {self.workers} worker processes")
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                handled = self.run_pass()
+                self.last_error = None
+                if handled:
+                    print(f"Enriched {handled} articles")
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Enrichment pass failed: {e}")
+            self._wake.wait(self.interval)
+
+    def stop(self):
+        """Stop after the current batch and shut down the process pool"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        self._stop.set()
+        self._wake.set()
+        if thread is not None:
+            thread.join()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def status(self):
+        return {
+            "running": self._thread is not None,
+            "checkpoint_id": self._checkpoint(),
+            "enriched": self.enriched,
+            "failed": self.failed,
+            "last_error": self.last_error
+        }
+
+
+_enricher = None
+_enricher_lock = threading.Lock()
+
+
+def get_enricher():
+    """Return the process-wide enricher"""
+    global _enricher
+    with _enricher_lock:
+        if _enricher is None:
+            _enricher = Enricher()
+        return _enricher
+
+
+def stop_enricher():
+    """Stop the process-wide enricher if it was started (called on shutdown)"""
+    with _enricher_lock:
+        enricher = _enricher
+    if enricher is not None:
+        enricher.stop()
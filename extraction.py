@@ -0,0 +1,305 @@
+"""Article metadata extraction and the staged download/parse pipeline"""
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fetch_governor import HostUnavailable, get_fetch_governor
+from html_cache import get_html_cache
+from metrics import (
+    ARTICLE_DOWNLOAD_SECONDS,
+    ARTICLE_PARSE_SECONDS,
+    EXTRACTION_FAILURES,
+    JSON_CLEAN_SECONDS
+)
+from records import ArticleRecord, json_safe
+
+_DONE = object()
+
+
+def article_metadata(article):
+    """Build the JSON-safe metadata dict from a parsed newspaper3k article"""
+    # Only plain fields; others (e.g. meta_data) may hold non-serializable objects.
+    # summary and keywords are left to the enrichment stage (enrichment.py)
+    return json_safe({
+        'publisher': article.source_url or article.domain,
+        'title': article.title,
+        'content': article.text,
+        'authors': article.authors,
+        'publish_date': article.publish_date
+    })
+
+def extract_article_metadata(url, refresh=False):
+    """Extract article metadata using newspaper3k library
+
+    The page comes from the on-disk HTML cache when it has been downloaded
+    before, unless refresh is set.
+    """
+    try:
+        html = fetch_article_html(url, refresh=refresh)
+        #print(f"Extracting body from {url} {html}")   # Raw article page
+        return parse_article_html(url, html)
+    except Exception as e:
+        print(f"Error extracting metadata from {url}: {e}")
+        return None
+
+def download_article_html(url, timeout=None):
+    """Download stage: fetch the raw HTML for an article URL (I/O bound)
+
+    The HTML is bytes when the response declares no charset, as
+    Article.download() would get it; newspaper decodes it when parsing.
+
+    Goes through the fetch governor: per-host rate and concurrency limits,
+    a short connect timeout, and HostUnavailable right away for a host that
+    keeps failing.
+    """
+    # newspaper (with lxml and nltk) is slow to import; only processes that extract load it
+    from newspaper.configuration import Configuration
+    from newspaper.network import get_html_2XX_only
+    if timeout is None:
+        timeout = float(os.getenv("EXTRACT_DOWNLOAD_TIMEOUT", "10"))
+    governor = get_fetch_governor()
+    config = Configuration()
+    config.request_timeout = governor.timeout(timeout)
+    # What Article.download() does, minus swallowing the error, so the governor
+    # can tell a dead host from a missing page
+    with governor.request(url):
+        return get_html_2XX_only(url, config)
+
+def fetch_article_html(url, refresh=False, offline=False, timeout=None):
+    """Article HTML from the on-disk cache, downloading and caching it when missing
+
+    refresh skips the cache lookup (the page is downloaded and the cached
+    copy replaced); offline never downloads and returns None on a miss.
+    """
+    cache = get_html_cache()
+    if not refresh:
+        html = cache.get(url)
+        if html is not None or offline:
+            return html
+    html = download_article_html(url, timeout)
+    try:
+        cache.put(url, html)
+    except Exception as e:
+        # The page itself downloaded fine; only the next poll loses the cached copy
+        print(f"Could not cache HTML for {url}: {e}")
+    return html
+
+def parse_article_html(url, html):
+    """Parse stage: run newspaper3k/lxml extraction over downloaded HTML (CPU bound)
+
+    Runs inside the parse process pool, so it must stay a picklable
+    module-level function that never touches the network.
+    """
+    from newspaper.article import Article
+    article = Article(url, fetch_images=False)
+    article.download(input_html=html)
+    article.parse()
+    return article_metadata(article)
+
+def build_article_data(entry, metadata):
+    """Merge an RSS entry with its extracted metadata into a `data` table row"""
+    with JSON_CLEAN_SECONDS.time():
+        return ArticleRecord.from_entry(entry, metadata).to_row()
+
+
+_parse_pool = None
+_parse_pool_workers = None
+_parse_pool_lock = threading.Lock()
+
+def get_parse_workers():
+    """Number of parse processes (EXTRACT_PARSE_WORKERS, defaults to every core)"""
+    return max(1, int(os.getenv("EXTRACT_PARSE_WORKERS", "0")) or os.cpu_count() or 1)
+
+def get_parse_pool(workers=None):
+    """Return the shared parse process pool, creating it on first use"""
+    global _parse_pool, _parse_pool_workers
+    if workers is None:
+        workers = get_parse_workers()
+    with _parse_pool_lock:
+        if _parse_pool is None or _parse_pool_workers != workers:
+            if _parse_pool is not None:
+                _parse_pool.shutdown(wait=False)
+            # spawn rather than fork: the server process has live threads
+            # (download workers, uvicorn) whose locks must not leak into children
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _parse_pool_workers = workers
+        return _parse_pool
+
+def parse_in_pool(url, html, workers=None):
+    """parse_article_html in the shared parse pool
+
+    A worker that dies (killed for memory, a crash in lxml) breaks the whole
+    pool; it is replaced and the parse tried once more.
+    """
+    global _parse_pool, _parse_pool_workers
+    pool = get_parse_pool(workers)
+    try:
+        return pool.submit(parse_article_html, url, html).result()
+    except BrokenProcessPool as e:
+        with _parse_pool_lock:
+            # Other parse threads may have replaced it already
+            if _parse_pool is pool:
+                print(f"Parse process pool broke, starting a new one: {e}")
+                pool.shutdown(wait=False, cancel_futures=True)
+                _parse_pool = None
+                _parse_pool_workers = None
+    return get_parse_pool(workers).submit(parse_article_html, url, html).result()
+
+def shutdown_parse_pool():
+    """Stop the parse process pool (called on application shutdown)"""
+    global _parse_pool, _parse_pool_workers
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False, cancel_futures=True)
+        _parse_pool = None
+        _parse_pool_workers = None
+
+def _put(q, item, stop):
+    """Blocking put that gives up once the pipeline is stopped"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _get(q, stop):
+    """Blocking get that gives up once the pipeline is stopped"""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+def extract_entries(entries, download_workers=None, parse_workers=None, queue_size=None, source=None,
+                    refresh=True, offline=False, deferred=None):
+    """Run RSS entries through the download -> parse pipeline, yielding (entry, metadata)
+
+    Downloads run on a thread pool, parsing runs on a process pool, and the
+    bounded queues between the stages (and towards the caller) provide
+    backpressure. Results arrive in completion order; metadata is None when
+    the article could not be downloaded or parsed, matching
+    extract_article_metadata.
+
+    entries may be a lazy iterator (e.g. entries of feeds still being
+    fetched); it is consumed only as fast as the downloads go. source(entry)
+    names the feed an entry came from, used to label the stage metrics.
+
+    With deferred, an entry whose host is paused by the fetch governor is
+    not yielded at all but handed to deferred(entry), so the caller can
+    leave it for a later poll instead of storing it without its article.
+
+    Pages are always downloaded and written to the HTML cache, as new or
+    updated entries need the current page; refresh=False reuses cached
+    pages instead, and with offline too nothing is downloaded at all
+    (re-extraction after a parser change, see ingest.reextract_articles).
+    """
+    if hasattr(entries, "__len__") and not entries:
+        return
+    if download_workers is None:
+        download_workers = int(os.getenv("EXTRACT_DOWNLOAD_CONCURRENCY", "8"))
+    if parse_workers is None:
+        parse_workers = get_parse_workers()
+    if queue_size is None:
+        queue_size = int(os.getenv("EXTRACT_QUEUE_SIZE", "32"))
+    if hasattr(entries, "__len__"):
+        download_workers = min(download_workers, len(entries))
+    download_workers = max(1, download_workers)
+
+    get_parse_pool(parse_workers)
+    pending = iter(entries)
+    pending_lock = threading.Lock()
+    downloaded = queue.Queue(maxsize=queue_size)
+    results = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    failures = []
+
+    remaining = {"download": download_workers, "parse": parse_workers}
+    remaining_lock = threading.Lock()
+
+    def finish(stage, q, sentinels):
+        # The last worker of a stage closes the next queue
+        with remaining_lock:
+            remaining[stage] -= 1
+            last = remaining[stage] == 0
+        if last:
+            for _ in range(sentinels):
+                _put(q, _DONE, stop)
+
+    def download_worker():
+        while not stop.is_set():
+            try:
+                # Iterators are not thread-safe, hand out one entry at a time
+                with pending_lock:
+                    entry = next(pending, _DONE)
+            except Exception as e:
+                # The entry source itself failed; stop and re-raise in the caller
+                failures.append(e)
+                stop.set()
+                break
+            if entry is _DONE:
+                break
+            url = entry.get('link')
+            feed = (source(entry) if source else None) or "unknown"
+            html = None
+            if url:
+                try:
+                    with ARTICLE_DOWNLOAD_SECONDS.time(feed=feed):
+                        html = fetch_article_html(url, refresh=refresh, offline=offline)
+                except HostUnavailable as e:
+                    if deferred is not None:
+                        deferred(entry)
+                        continue
+                    print(f"Error extracting metadata from {url}: {e}")
+                except Exception as e:
+                    print(f"Error extracting metadata from {url}: {e}")
+            if not html and not offline:
+                EXTRACTION_FAILURES.inc(feed=feed, stage="download")
+            if not _put(downloaded, (entry, url, html, feed), stop):
+                break
+        finish("download", downloaded, parse_workers)
+
+    def parse_worker():
+        while True:
+            item = _get(downloaded, stop)
+            if item is _DONE:
+                break
+            entry, url, html, feed = item
+            metadata = None
+            if html:
+                try:
+                    with ARTICLE_PARSE_SECONDS.time(feed=feed):
+                        metadata = parse_in_pool(url, html, parse_workers)
+                except Exception as e:
+                    EXTRACTION_FAILURES.inc(feed=feed, stage="parse")
+                    print(f"Error extracting metadata from {url}: {e}")
+            if not _put(results, (entry, metadata), stop):
+                break
+        finish("parse", results, 1)
+
+    threads = [threading.Thread(target=download_worker, name=f"article-download-{i}", daemon=True)
+               for i in range(download_workers)]
+    threads += [threading.Thread(target=parse_worker, name=f"article-parse-{i}", daemon=True)
+                for i in range(parse_workers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            item = _get(results, stop)
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        # Also reached when the caller stops iterating early
+        stop.set()
+    if failures:
+        raise failures[0]
@@ -0,0 +1,84 @@
+"""Precomputed facet index (articles grouped by publisher) for UI filters"""
+import threading
+
+from search_index import article_key
+
+
+class FacetIndex:
+    """Keeps, per value of one field, the keys of the articles carrying it
+
+    Like SearchIndex it is kept current with sync(), which only moves
+    articles whose value changed. Filtering a result list costs time
+    proportional to that list (or to the facet), never to the whole archive.
+    """
+
+    def __init__(self, field="publisher"):
+        self.field = field
+        self._lock = threading.Lock()
+        self._members = {}   # value -> set of keys
+        self._values = {}    # key -> value
+        self._docs = {}      # key -> article
+        self._recency = {}   # key -> created_at
+        self._ordered = {}   # value -> articles newest first, built on demand
+
+    def _move(self, key, value):
+        old = self._values.get(key)
+        if old == value:
+            return
+        if old is not None:
+            members = self._members[old]
+            members.discard(key)
+            if not members:
+                del self._members[old]
+            self._ordered.pop(old, None)
+        if value is None:
+            self._values.pop(key, None)
+        else:
+            self._values[key] = value
+            self._members.setdefault(value, set()).add(key)
+            self._ordered.pop(value, None)
+
+    def sync(self, articles):
+        """Bring the facets in line with the current article list"""
+        with self._lock:
+            current = set()
+            for article in articles:
+                key = article_key(article)
+                if key is None:
+                    continue
+                current.add(key)
+                self._move(key, article.get(self.field) or None)
+                recency = article.get("created_at") or ""
+                # The ordered lists hold the article dicts themselves, so a new
+                # dict for the article (reload, delta) invalidates its list too
+                if self._docs.get(key) is not article or self._recency.get(key) != recency:
+                    self._docs[key] = article
+                    self._recency[key] = recency
+                    self._ordered.pop(self._values.get(key), None)
+            for key in [key for key in self._docs if key not in current]:
+                self._move(key, None)
+                del self._docs[key]
+                del self._recency[key]
+
+    def counts(self):
+        """{value: number of articles}"""
+        with self._lock:
+            return {value: len(keys) for value, keys in self._members.items()}
+
+    def articles(self, value):
+        """Articles with the given value, newest first"""
+        with self._lock:
+            ordered = self._ordered.get(value)
+            if ordered is None:
+                keys = sorted(self._members.get(value, ()), key=self._recency.__getitem__, reverse=True)
+                ordered = self._ordered[value] = [self._docs[key] for key in keys]
+            return ordered
+
+    def filter(self, results, value):
+        """Keep the search results (SearchResults) that carry the given value, in rank order"""
+        with self._lock:
+            members = self._members.get(value)
+            if not members:
+                return []
+            docs = self._docs
+            return [docs[key] for key in results.keys() if key in members]
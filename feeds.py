@@ -0,0 +1,240 @@
+"""RSS feed configuration and concurrent feed fetching"""
+import calendar
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+import state
+from fetch_governor import get_fetch_governor
+from metrics import FEED_FETCH_SECONDS, FEED_PARSE_SECONDS
+
+# create dictionary off rss feeds
+RSS_FEEDS = {
+    "ithacavoice": "https://ithacavoice.org/feed",
+    "607newsnow": "https://607newsnow.com/feed",
+    "ithacatimes": "http://www.ithaca.com/search/?q=&t=article&l=100&d=&d1=&d2=&s=start_time&sd=desc&c[]=news*&f=rss",
+    "cornellsun": "https://cornellsun.com/feed/",
+    "ithacajournal": "https://www.ithacajournal.com/news/feed/",
+    "fingerlakes1": "https://fingerlakes1.com/feed/",
+    "tompkinsweekly": "https://tompkinsweekly.com/feed/",
+    "cornellchronicle": "https://news.cornell.edu/feed",
+    "cornellresearch": "https://research.cornell.edu/feed",
+    "ithacacollege": "https://www.ithaca.edu/news/feed"
+}
+
+USER_AGENT = "Mozilla/5.0 (compatible; IthacaNewsAggregator/1.0)"
+
+
+class FeedCache:
+    """Persistent per-feed ETag / Last-Modified / content-hash cache
+
+    Validators seen during a poll are held as pending and only written by
+    commit(), which the caller runs once the feed's entries have been
+    processed. A poll that dies half way therefore re-fetches those feeds.
+    """
+
+    def __init__(self, filename="feed_cache.sqlite3"):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._conn = state.connect(filename)
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS feed_cache (
+                    feed_name TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_hash TEXT,
+                    updated_at REAL
+                )"""
+            )
+
+    def get(self, feed_name, feed_url):
+        """Return the cached validators for a feed, or None if unknown or the URL changed"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, etag, last_modified, content_hash FROM feed_cache WHERE feed_name = ?",
+                (feed_name,)
+            ).fetchone()
+        if row is None or row[0] != feed_url:
+            return None
+        return {"etag": row[1], "last_modified": row[2], "content_hash": row[3]}
+
+    def remember(self, feed_name, feed_url, etag, last_modified, content_hash):
+        """Stage new validators for a feed until commit()"""
+        with self._lock:
+            self._pending[feed_name] = (feed_name, feed_url, etag, last_modified, content_hash, time.time())
+
+    def commit(self, feed_names=None):
+        """Persist staged validators (of the given feeds, or of all feeds)"""
+        with self._lock:
+            if feed_names is None:
+                feed_names = list(self._pending)
+            rows = [self._pending.pop(name) for name in feed_names if name in self._pending]
+            if rows:
+                with self._conn:
+                    self._conn.executemany(
+                        """INSERT OR REPLACE INTO feed_cache
+                           (feed_name, url, etag, last_modified, content_hash, updated_at)
+                           VALUES (?, ?, ?, ?, ?, ?)""",
+                        rows
+                    )
+        return len(rows)
+
+    def discard(self):
+        """Drop staged validators without persisting them"""
+        with self._lock:
+            self._pending.clear()
+
+    def expire(self, feed_names):
+        """Forget the stored validators of feeds, so their next fetch reads them in full"""
+        feed_names = list(feed_names)
+        if not feed_names:
+            return
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("DELETE FROM feed_cache WHERE feed_name = ?", [(name,) for name in feed_names])
+
+
+_feed_cache = None
+_feed_cache_lock = threading.Lock()
+
+def get_feed_cache():
+    """Return the process-wide feed cache"""
+    global _feed_cache
+    with _feed_cache_lock:
+        if _feed_cache is None:
+            _feed_cache = FeedCache()
+        return _feed_cache
+
+
+def get_fetch_concurrency():
+    """Maximum number of feeds downloaded at the same time (FEED_FETCH_CONCURRENCY)"""
+    return max(1, int(os.getenv("FEED_FETCH_CONCURRENCY", "5")))
+
+
+def get_fetch_timeout():
+    """Per-feed request timeout in seconds (FEED_FETCH_TIMEOUT)"""
+    return float(os.getenv("FEED_FETCH_TIMEOUT", "15"))
+
+
+def publish_rate(entries):
+    """Articles per hour over the time span the entries cover, or None if unknown"""
+    stamps = []
+    for entry in entries:
+        parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+        if parsed:
+            stamps.append(calendar.timegm(parsed))
+    if len(stamps) < 2:
+        return None
+    span = max(stamps) - min(stamps)
+    if span <= 0:
+        return None
+    return (len(stamps) - 1) * 3600 / span
+
+
+def fetch_feed(feed_name, feed_url, timeout=None, cache=None):
+    """Download and parse a single feed, returning (entries, stats)
+
+    With a cache, the stored ETag / Last-Modified validators are sent along
+    and a 304 or byte-identical body skips parsing entirely. The download
+    goes through the fetch governor, and stats["host"] reports the state of
+    the feed host's circuit breaker.
+    """
+    if timeout is None:
+        timeout = get_fetch_timeout()
+    governor = get_fetch_governor()
+    entries, stats = _fetch_feed(feed_name, feed_url, governor, timeout, cache)
+    stats["host"] = governor.host_status(feed_url)
+    return entries, stats
+
+
+def _fetch_feed(feed_name, feed_url, governor, timeout, cache):
+    started = time.perf_counter()
+    cached = cache.get(feed_name, feed_url) if cache is not None else None
+    headers = {"User-Agent": USER_AGENT}
+    if cached:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+    try:
+        # feedparser.parse(url) has no timeout, so download the document ourselves
+        with FEED_FETCH_SECONDS.time(feed=feed_name), governor.request(feed_url):
+            response = requests.get(feed_url, timeout=governor.timeout(timeout), headers=headers)
+            if response.status_code >= 500 or response.status_code == 429:
+                response.raise_for_status()
+        if response.status_code == 304:
+            print(f"Feed {feed_name}: not modified")
+            return [], {
+                "url": feed_url,
+                "articles_found": 0,
+                "cache": "not_modified",
+                "fetch_seconds": round(time.perf_counter() - started, 3)
+            }
+        response.raise_for_status()
+
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        if cache is not None:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if cached and cached["content_hash"] == content_hash:
+                # Same document, but the server may have rotated its validators
+                if (etag, last_modified) != (cached["etag"], cached["last_modified"]):
+                    cache.remember(feed_name, feed_url, etag, last_modified, content_hash)
+                print(f"Feed {feed_name}: unchanged")
+                return [], {
+                    "url": feed_url,
+                    "articles_found": 0,
+                    "cache": "unchanged",
+                    "fetch_seconds": round(time.perf_counter() - started, 3)
+                }
+            cache.remember(feed_name, feed_url, etag, last_modified, content_hash)
+
+        import feedparser  # loaded on the first poll, not when the API starts
+        with FEED_PARSE_SECONDS.time(feed=feed_name):
+            feed = feedparser.parse(response.content, response_headers=response.headers)
+        entries = feed.entries
+        stats = {
+            "url": feed_url,
+            "articles_found": len(entries),
+            "feed_title": getattr(feed.feed, 'title', 'Unknown'),
+            "feed_description": getattr(feed.feed, 'description', 'No description'),
+            "fetch_seconds": round(time.perf_counter() - started, 3)
+        }
+        rate = publish_rate(entries)
+        if rate is not None:
+            stats["publish_rate_per_hour"] = round(rate, 3)
+        if cache is not None:
+            stats["cache"] = "updated" if cached else "miss"
+        print(f"Feed {feed_name}: {len(entries)} articles found")
+        return entries, stats
+    except Exception as e:
+        print(f"Error parsing feed {feed_name}: {e}")
+        return [], {
+            "url": feed_url,
+            "error": str(e),
+            "fetch_seconds": round(time.perf_counter() - started, 3)
+        }
+
+
+def iter_feeds(rss_feeds, max_workers=None, timeout=None, cache=None):
+    """Fetch feeds concurrently, yielding (feed_name, entries, stats) as each one completes"""
+    if max_workers is None:
+        max_workers = get_fetch_concurrency()
+    if not rss_feeds:
+        return
+
+    workers = min(max_workers, len(rss_feeds))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="feed-fetch") as executor:
+        futures = {
+            executor.submit(fetch_feed, feed_name, feed_url, timeout, cache): feed_name
+            for feed_name, feed_url in rss_feeds.items()
+        }
+        for future in as_completed(futures):
+            entries, stats = future.result()
+            yield futures[future], entries, stats
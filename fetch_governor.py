@@ -0,0 +1,216 @@
+"""Per-host politeness for feed and article downloads: rate limits, timeouts and circuit breakers"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+
+from metrics import FETCH_CIRCUIT_REJECTIONS
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class HostUnavailable(Exception):
+    """The host's circuit is open: it failed repeatedly and is not called until its cooldown ends"""
+
+
+def is_host_failure(error):
+    """Whether an error says the host is in trouble (rather than e.g. one missing page)"""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return False
+
+
+class HostState:
+    """Token bucket, concurrency slots and circuit breaker of one host"""
+
+    def __init__(self, rate, burst, concurrency):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.refilled = time.monotonic()
+        self.slots = threading.BoundedSemaphore(concurrency) if concurrency > 0 else None
+        self.state = CLOSED
+        self.failures = 0
+        self.cooldown = 0
+        self.opened_at = None
+        self.probing = False
+        self.requests = 0
+        self.total_failures = 0
+        self.rejected = 0
+        self.last_error = None
+
+    def take_token(self):
+        """Seconds to wait before a token is available, taking it if there is one"""
+        if self.rate <= 0:
+            return 0
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled) * self.rate)
+        self.refilled = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class FetchGovernor:
+    """Decides when (and whether) a download from a host may go ahead
+
+    Each host gets a token bucket (FETCH_HOST_RATE requests per second, bursts
+    of FETCH_HOST_BURST) and at most FETCH_HOST_CONCURRENCY requests in flight;
+    0 turns either limit off. After FETCH_FAILURE_THRESHOLD failures in a row
+    (connection errors, timeouts, 5xx and 429 responses) the host's circuit
+    opens and requests fail fast with HostUnavailable for FETCH_COOLDOWN
+    seconds. Then a single probe request is let through: if it succeeds the
+    circuit closes, otherwise it opens again for twice as long, up to
+    FETCH_MAX_COOLDOWN.
+
+    State lives in memory, so each process (API, worker) keeps its own.
+    """
+
+    def __init__(self, rate=None, burst=None, concurrency=None, failure_threshold=None,
+                 cooldown=None, max_cooldown=None, connect_timeout=None):
+        if rate is None:
+            rate = float(os.getenv("FETCH_HOST_RATE", "2"))
+        if burst is None:
+            burst = float(os.getenv("FETCH_HOST_BURST", "4"))
+        if concurrency is None:
+            concurrency = int(os.getenv("FETCH_HOST_CONCURRENCY", "2"))
+        if failure_threshold is None:
+            failure_threshold = int(os.getenv("FETCH_FAILURE_THRESHOLD", "5"))
+        if cooldown is None:
+            cooldown = float(os.getenv("FETCH_COOLDOWN", "300"))
+        if max_cooldown is None:
+            max_cooldown = float(os.getenv("FETCH_MAX_COOLDOWN", "3600"))
+        if connect_timeout is None:
+            connect_timeout = float(os.getenv("FETCH_CONNECT_TIMEOUT", "5"))
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.concurrency = concurrency
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.max_cooldown = max(cooldown, max_cooldown)
+        self.connect_timeout = connect_timeout
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def timeout(self, read_timeout):
+        """(connect, read) timeout for requests: a dead host is given up on quickly"""
+        return (min(self.connect_timeout, read_timeout), read_timeout)
+
+    def _host(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = HostState(self.rate, self.burst, self.concurrency)
+            return state
+
+    def _admit(self, host, state):
+        """Check the circuit; returns whether this request is the half-open probe"""
+        with self._lock:
+            if state.state == CLOSED:
+                return False
+            if state.state == OPEN and time.monotonic() - state.opened_at >= state.cooldown:
+                state.state = HALF_OPEN
+            if state.state == HALF_OPEN and not state.probing:
+                state.probing = True
+                return True
+            state.rejected += 1
+        FETCH_CIRCUIT_REJECTIONS.inc(host=host)
+        raise HostUnavailable(f"{host} failed {state.failures} times in a row, not retrying for now")
+
+    def _record(self, host, state, error, probe):
+        with self._lock:
+            state.requests += 1
+            if probe:
+                state.probing = False
+            if error is None:
+                state.failures = 0
+                if state.state != CLOSED:
+                    print(f"Host {host} is responding again")
+                state.state = CLOSED
+                state.cooldown = 0
+                return
+            state.failures += 1
+            state.total_failures += 1
+            state.last_error = str(error)
+            if probe or (state.state == CLOSED and state.failures >= self.failure_threshold):
+                # A failed probe doubles the wait before the next one
+                state.cooldown = min(self.max_cooldown, state.cooldown * 2) if probe else self.cooldown
+                state.state = OPEN
+                state.opened_at = time.monotonic()
+                print(f"Host {host} failed {state.failures} times in a row, pausing it for {state.cooldown:.0f}s")
+
+    @contextmanager
+    def request(self, url):
+        """Wrap one download from url's host: waits for a token and a slot, records the outcome
+
+        Raises HostUnavailable without waiting when the host's circuit is open.
+        """
+        host = urlsplit(url).hostname or url
+        state = self._host(host)
+        probe = self._admit(host, state)
+        while True:
+            with self._lock:
+                wait = state.take_token()
+            if not wait:
+                break
+            time.sleep(wait)
+        if state.slots is not None:
+            state.slots.acquire()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            if is_host_failure(e):
+                error = e
+            raise
+        finally:
+            if state.slots is not None:
+                state.slots.release()
+            self._record(host, state, error, probe)
+
+    def host_status(self, url_or_host):
+        """Circuit state and counters of one host"""
+        host = urlsplit(url_or_host).hostname or url_or_host
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                return {"host": host, "circuit": CLOSED, "requests": 0}
+            status = {
+                "host": host,
+                "circuit": state.state,
+                "requests": state.requests,
+                "failures_in_a_row": state.failures,
+                "failures": state.total_failures,
+                "rejected": state.rejected
+            }
+            if state.state != CLOSED:
+                status["retry_in_seconds"] = round(max(0, state.cooldown - (time.monotonic() - state.opened_at)), 1)
+                status["last_error"] = state.last_error
+            return status
+
+    def status(self):
+        """host_status() of every host seen so far"""
+        with self._lock:
+            hosts = sorted(self._hosts)
+        return {host: self.host_status(host) for host in hosts}
+
+
+_fetch_governor = None
+_fetch_governor_lock = threading.Lock()
+
+
+def get_fetch_governor():
+    """Return the process-wide fetch governor"""
+    global _fetch_governor
+    with _fetch_governor_lock:
+        if _fetch_governor is None:
+            _fetch_governor = FetchGovernor()
+        return _fetch_governor
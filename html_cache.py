@@ -0,0 +1,159 @@
+"""Compressed, content-addressed on-disk cache of downloaded article HTML"""
+import hashlib
+import os
+import threading
+import time
+import zlib
+
+import state
+
+COMPRESSION_LEVEL = 6
+
+
+class HtmlCache:
+    """Maps article URLs to zlib-compressed HTML blobs named by their SHA-256
+
+    Identical pages under different URLs share one blob. The index (URL ->
+    digest, last access) lives in SQLite next to the other state; the blobs
+    live under STATE_DIR/<directory>/ab/<digest>.z. When the compressed
+    blobs exceed max_bytes, the least recently used URLs are dropped and
+    blobs nobody points to any more are deleted.
+    """
+
+    def __init__(self, directory="html_cache", max_bytes=None, filename="html_cache.sqlite3"):
+        if max_bytes is None:
+            max_bytes = int(os.getenv("HTML_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+        self.max_bytes = max_bytes
+        self.directory = state.state_path(directory)
+        self._lock = threading.Lock()
+        self._conn = state.connect(filename)
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at);
+                CREATE INDEX IF NOT EXISTS pages_digest ON pages (digest);
+                CREATE TABLE IF NOT EXISTS blobs (
+                    digest TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL
+                );
+            """)
+            # Pages downloaded without a declared charset are kept as the raw bytes
+            if "raw" not in [row[1] for row in self._conn.execute("PRAGMA table_info(pages)")]:
+                self._conn.execute("ALTER TABLE pages ADD COLUMN raw INTEGER NOT NULL DEFAULT 0")
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def _blob_path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest + ".z")
+
+    def get(self, url):
+        """Cached HTML for a URL (str, or bytes if it was stored as bytes), or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT digest, raw FROM pages WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        try:
+            with open(self._blob_path(row[0]), "rb") as f:
+                html = zlib.decompress(f.read())
+            return html if row[1] else html.decode("utf-8")
+        except (OSError, zlib.error, UnicodeDecodeError) as e:
+            # Blob lost or damaged; forget the URL so it gets downloaded again
+            print(f"HTML cache entry for {url} is unreadable: {e}")
+            self.discard(url)
+            return None
+
+    def put(self, url, html):
+        """Store the HTML downloaded for a URL, str or undecoded bytes"""
+        if not html or self.max_bytes <= 0:
+            return
+        is_bytes = isinstance(html, bytes)
+        raw = html if is_bytes else html.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        path = self._blob_path(digest)
+        with self._lock:
+            known = self._conn.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if not known:
+            data = zlib.compress(raw, COMPRESSION_LEVEL)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = f"{path}.{threading.get_ident()}.tmp"
+            with open(temporary, "wb") as f:
+                f.write(data)
+            os.replace(temporary, path)
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                previous = self._conn.execute("SELECT digest FROM pages WHERE url = ?", (url,)).fetchone()
+                if not known and self._conn.execute(
+                        "INSERT OR IGNORE INTO blobs (digest, size) VALUES (?, ?)", (digest, len(data))).rowcount:
+                    self._total += len(data)
+                self._conn.execute(
+                    "INSERT INTO pages (url, digest, fetched_at, accessed_at, raw) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (url) DO UPDATE SET digest = excluded.digest, "
+                    "fetched_at = excluded.fetched_at, accessed_at = excluded.accessed_at, raw = excluded.raw",
+                    (url, digest, now, now, int(is_bytes))
+                )
+                # The page changed since it was cached, the old version may now be unused
+                if previous is not None and previous[0] != digest:
+                    self._drop_unused_blob(previous[0])
+            self._evict()
+
+    def discard(self, url):
+        """Forget a URL (its blob goes once no other URL uses it)"""
+        with self._lock:
+            with self._conn:
+                row = self._conn.execute("DELETE FROM pages WHERE url = ? RETURNING digest", (url,)).fetchone()
+                if row is not None:
+                    self._drop_unused_blob(row[0])
+
+    def _evict(self):
+        # Least recently used URLs first, until the blobs fit again
+        while self._total > self.max_bytes:
+            oldest = self._conn.execute(
+                "SELECT url, digest FROM pages ORDER BY accessed_at LIMIT 64"
+            ).fetchall()
+            if not oldest:
+                break
+            with self._conn:
+                for url, digest in oldest:
+                    if self._total <= self.max_bytes:
+                        break
+                    self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+                    self._drop_unused_blob(digest)
+
+    def _drop_unused_blob(self, digest):
+        if self._conn.execute("SELECT 1 FROM pages WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+            return
+        row = self._conn.execute("DELETE FROM blobs WHERE digest = ? RETURNING size", (digest,)).fetchone()
+        if row is None:
+            return
+        self._total -= row[0]
+        try:
+            os.remove(self._blob_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        """Number of cached URLs and distinct pages, and their compressed size"""
+        with self._lock:
+            urls = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            blobs = self._conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+            return {"urls": urls, "pages": blobs, "bytes": self._total, "max_bytes": self.max_bytes}
+
+
+_html_cache = None
+_html_cache_lock = threading.Lock()
+
+
+def get_html_cache():
+    """Return the process-wide HTML cache, opening it on first use"""
+    global _html_cache
+    with _html_cache_lock:
+        if _html_cache is None:
+            _html_cache = HtmlCache()
+        return _html_cache
@@ -0,0 +1,97 @@
+"""Conditional (ETag / If-None-Match) and compressed API responses"""
+import gzip
+import hashlib
+
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Smaller bodies are sent as is, compressing them gains nothing
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+# Brotli quality 5 compresses better than gzip -6 at about the same speed
+BROTLI_QUALITY = 5
+
+
+def make_etag(*parts):
+    """Strong ETag for the representation determined by parts (store version, query)"""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _opaque_tag(tag):
+    # Compare without the W/ prefix and the content-coding suffix added below
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for encoding in ("gzip", "br"):
+        if tag.endswith("-" + encoding):
+            return tag[:-len(encoding) - 1]
+    return tag
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header lists etag, in any content coding"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return _opaque_tag(etag) in {_opaque_tag(tag) for tag in if_none_match.split(",")}
+
+
+def choose_encoding(accept_encoding):
+    """The content coding to use for a client's Accept-Encoding: br, gzip or None"""
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    """Body compressed with the given content coding"""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def conditional_response(request, etag, render, media_type="application/json"):
+    """304 if the client already has etag, otherwise render() compressed as accepted
+
+    render() returns the body as bytes and is only called when a body is sent.
+    Compressed bodies are separate representations, so their ETag carries the
+    coding as a suffix (If-None-Match matches any of them).
+    """
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        headers["ETag"] = etag if encoding is None else f'{etag[:-1]}-{encoding}"'
+        return Response(status_code=304, headers=headers)
+    body = render()
+    if encoding is not None and len(body) >= MIN_COMPRESS_SIZE:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+        headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+    else:
+        headers["ETag"] = etag
+    return Response(content=body, media_type=media_type, headers=headers)
@@ -0,0 +1,260 @@
+"""Feed ingest: fetch feeds, skip seen entries, extract articles, write rows"""
+import os
+import threading
+
+from extraction import build_article_data, extract_entries
+from feeds import get_feed_cache, iter_feeds
+from near_duplicates import get_near_duplicate_index
+from seen_index import get_seen_index
+from storage import get_store
+from writer import ArticleWriter
+
+_listeners = []
+_listeners_lock = threading.Lock()
+# Feeds some ingest (scheduled poll or poll job) is working on right now
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+
+def add_ingest_listener(callback):
+    """Call callback(result) after every ingest that wrote at least one row"""
+    with _listeners_lock:
+        _listeners.append(callback)
+
+
+# Columns that come from parsing the article page
+REEXTRACT_COLUMNS = ("title", "published", "author", "publisher", "description", "content")
+
+
+def _no_progress(stage, info):
+    pass
+
+
+def ingest_feeds(rss_feeds, force=False, progress=None):
+    """Poll the given feeds and upsert their new or updated articles
+
+    A feed that another ingest in this process is already working on (the
+    scheduler and a /poll job, say) is left to it and listed in the result's
+    "feeds_busy" instead; see _ingest_feeds for the rest.
+    """
+    with _in_flight_lock:
+        busy = [feed_name for feed_name in rss_feeds if feed_name in _in_flight]
+        rss_feeds = {feed_name: feed_url for feed_name, feed_url in rss_feeds.items() if feed_name not in _in_flight}
+        _in_flight.update(rss_feeds)
+    if busy:
+        print(f"Already being polled, skipped: {', '.join(busy)}")
+    try:
+        result = _ingest_feeds(rss_feeds, force, progress)
+    finally:
+        with _in_flight_lock:
+            _in_flight.difference_update(rss_feeds)
+    result["feeds_busy"] = busy
+    return result
+
+
+def _ingest_feeds(rss_feeds, force=False, progress=None):
+    """Poll the given feeds and upsert their new or updated articles
+
+    Unchanged feeds (304 or identical body) and already-ingested entries are
+    skipped unless force is set. An entry whose article could not be
+    extracted is written once from what the feed says, then retried with a
+    growing delay (see SeenIndex.fail) until it works or runs out of
+    attempts; the feeds of entries due for a retry are read in full instead
+    of conditionally. Entries from a site the fetch governor has paused are
+    not written at all and wait for the next poll. Feeds are processed as they arrive: entries
+    flow straight into extraction and rows are written in batches, so no
+    list of the whole poll is built up. An article whose content nearly
+    matches one ingested before (the same wire story from another source)
+    is stored with duplicate_of pointing at it and without its own copy of
+    the text; set NEAR_DUPLICATES=0 to store every copy in full.
+
+    progress(stage, info) is called for each feed fetched ("fetch", then
+    "filter"), each article extracted ("extract") and each row written
+    ("write"). It may be called from worker threads.
+    """
+    report = progress or _no_progress
+    feed_cache = None if force else get_feed_cache()
+    
+    # shared article store (Supabase or local SQLite)
+    store = get_store()
+    seen_index = get_seen_index()
+    near_duplicates = get_near_duplicate_index() if os.getenv("NEAR_DUPLICATES", "1") != "0" else None
+    feed_stats = {}
+    feed_of_link = {}   # labels the extraction metrics with the entry's feed
+    counts = {"found": 0, "new": 0, "skipped": 0, "extracted": 0, "written": 0, "duplicates": 0,
+              "deferred": 0, "failed": 0}
+    if feed_cache is not None:
+        # A 304 would hide the entries whose retry is due
+        feed_cache.expire(seen_index.due_feeds() & set(rss_feeds))
+    
+    def new_entries():
+        # fetch feeds concurrently; each feed's entries are handed on as soon as it arrives
+        for feed_name, entries, stats in iter_feeds(rss_feeds, cache=feed_cache):
+            feed_stats[feed_name] = stats
+            counts["found"] += len(entries)
+            report("fetch", {
+                "feed": feed_name,
+                "feeds_done": len(feed_stats),
+                "feeds": len(rss_feeds),
+                "articles_found": counts["found"],
+                "feed_articles": len(entries),
+                "cache": stats.get("cache"),
+                "error": stats.get("error")
+            })
+            
+            # skip entries that were already ingested and have not been updated since
+            if force:
+                fresh, skipped = entries, 0
+            else:
+                fresh, skipped = seen_index.split(entries)
+            counts["new"] += len(fresh)
+            counts["skipped"] += skipped
+            report("filter", {"feed": feed_name, "new": counts["new"], "skipped": counts["skipped"]})
+            for entry in fresh:
+                feed_of_link[entry.get("link")] = feed_name
+                yield entry
+    
+    def deferred(entry):
+        # The article's site is paused after repeated failures; try it on the next poll
+        counts["deferred"] += 1
+        seen_index.fail(entry, feed_of_link.get(entry.get("link")), count=False)
+
+    def on_written(row, entry):
+        article, extracted, ingested = entry
+        # A fallback row (article not extracted) stays up for retry
+        if ingested:
+            seen_index.mark(article)
+        elif not extracted:
+            seen_index.fallback_written(article)
+        counts["written"] += 1
+        report("write", {"written": counts["written"], "failed": writer.failed, "link": row.get("link")})
+
+    def on_failed(row, entry, error):
+        # Not stored: try the entry again on a later poll (a fallback row's
+        # failed extraction already used up an attempt)
+        article, extracted, ingested = entry
+        seen_index.fail(article, feed_of_link.get(article.get("link")), count=extracted)
+    
+    # upsert articles into database in batches (keyed on link, so updated entries replace their row)
+    writer = ArticleWriter(store, on_written=on_written, on_failed=on_failed)
+    with writer:
+        # download and parse articles in the extraction pipeline
+        for article, metadata in extract_entries(new_entries(), deferred=deferred,
+                                                 source=lambda entry: feed_of_link.get(entry.get("link"))):
+            counts["extracted"] += 1
+            error = None
+            write, ingested = True, True
+            if metadata is None:
+                counts["failed"] += 1
+                attempts, stored = seen_index.fail(article, feed_of_link.get(article.get("link")))
+                # The fallback row (what the feed says) is written once, not on every
+                # retry, and kept for good once the entry runs out of attempts
+                write = not stored
+                ingested = attempts >= seen_index.max_attempts
+                if ingested and not write:
+                    seen_index.mark(article)
+            try:
+                if write:
+                    row = build_article_data(article, metadata)
+                    if near_duplicates is not None:
+                        row["duplicate_of"] = near_duplicates.assign(row["link"], row["content"])
+                        if row["duplicate_of"]:
+                            # The original carries the text; this row only records where else it ran
+                            row["content"] = row["description"] = None
+                            counts["duplicates"] += 1
+                    writer.add(row, (article, metadata is not None, ingested))
+            except Exception as e:
+                error = str(e)
+                if metadata is not None:
+                    seen_index.fail(article, feed_of_link.get(article.get("link")))
+                print(f"Error processing article {article.get('link')}: {e}")
+            report("extract", {
+                "done": counts["extracted"],
+                "queued": counts["new"],
+                "deferred": counts["deferred"],
+                "link": article.get("link"),
+                "extracted": metadata is not None and error is None
+            })
+    inserted_count = writer.written
+    skipped_count = counts["skipped"]
+    report("write", {"written": writer.written, "failed": writer.failed})
+    
+    print(f"Total articles from all feeds: {counts['found']}")
+    print(f"Articles already ingested and unchanged: {skipped_count}")
+    print(f"Articles inserted into database: {inserted_count}")
+    print(f"Near-duplicates of earlier articles: {counts['duplicates']}")
+    print(f"Articles that could not be extracted (retried later): {counts['failed']}")
+    print(f"Articles left for later, their site is paused: {counts['deferred']}")
+    
+    # Only remember feed validators once their entries have been processed
+    if feed_cache is not None:
+        feed_cache.commit(rss_feeds.keys())
+    
+    # Report feeds in configuration order, as they complete in any order
+    feed_stats = {feed_name: feed_stats[feed_name] for feed_name in rss_feeds if feed_name in feed_stats}
+    
+    result = {
+        "articles_processed": counts["found"],
+        "articles_inserted": inserted_count,
+        "articles_skipped": skipped_count,
+        "articles_duplicated": counts["duplicates"],
+        "articles_deferred": counts["deferred"],
+        "articles_failed": counts["failed"],
+        "feed_statistics": feed_stats
+    }
+    
+    # New rows are in, e.g. let the UI reload its cached articles
+    if inserted_count:
+        with _listeners_lock:
+            listeners = list(_listeners)
+        for callback in listeners:
+            try:
+                callback(result)
+            except Exception as e:
+                print(f"Error in ingest listener: {e}")
+    
+    return result
+
+
+def reextract_articles(page_size=500):
+    """Parse every stored article again from its cached HTML, updating the rows that changed
+
+    For after a parser change: nothing is downloaded, so articles whose page
+    is not in the HTML cache are left as they are, and so are near-duplicates
+    (stored without text). A row whose text changes loses its summary and
+    keywords, which the enrichment stage then computes again.
+    """
+    store = get_store()
+    counts = {"articles": 0, "extracted": 0, "updated": 0}
+
+    def stored_articles():
+        after = None
+        while True:
+            rows = store.list(["id", "created_at", "link", "duplicate_of"] + list(REEXTRACT_COLUMNS),
+                              limit=page_size, after=after)
+            for row in rows:
+                counts["articles"] += 1
+                if row.get("link") and not row.get("duplicate_of"):
+                    yield row
+            if len(rows) < page_size:
+                return
+            after = (rows[-1]["created_at"], rows[-1]["id"])
+
+    for article, metadata in extract_entries(stored_articles(), refresh=False, offline=True):
+        if metadata is None:
+            continue
+        counts["extracted"] += 1
+        try:
+            row = build_article_data(article, metadata)
+            fields = {column: row[column] for column in REEXTRACT_COLUMNS if row[column] != article.get(column)}
+            if not fields:
+                continue
+            if "content" in fields:
+                fields["summary"] = fields["keywords"] = None
+            store.update(article["id"], fields)
+            counts["updated"] += 1
+        except Exception as e:
+            print(f"Error re-extracting article {article.get('link')}: {e}")
+    print(f"Re-extracted {counts['extracted']} of {counts['articles']} articles from cached HTML, "
+          f"{counts['updated']} changed")
+    return counts
@@ -0,0 +1,126 @@
+"""Background poll jobs: submit, coalesce, and report progress"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class PollJobManager:
+    """Runs ingests as background jobs so HTTP requests return immediately
+
+    At most one job runs at a time; submitting while one is queued or running
+    returns that job instead of starting another (coalescing). Jobs run on
+    their own thread, never on the server's request workers. The last
+    `history` jobs are kept for the status endpoint.
+
+    A listener(stage, info) passed to submit() receives every progress
+    event of the job from then on, and finally a "finished" event with the
+    job's status, result and error. Listeners are called from the job's
+    worker threads and should not block.
+
+    run(force, progress) performs the ingest and returns its result dict.
+    """
+
+    def __init__(self, run, history=20):
+        self.run = run
+        self.history = history
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._active = None
+        self._listeners = {}   # job_id -> listeners
+
+    def submit(self, force=False, listener=None):
+        """Start a poll job, or join the one in progress; returns (job, coalesced)"""
+        with self._lock:
+            if self._active is not None:
+                if listener is not None:
+                    self._listeners[self._active["job_id"]].append(listener)
+                return self._snapshot(self._active), True
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "status": "queued",
+                "force": force,
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "stages": {},
+                "result": None,
+                "error": None
+            }
+            self._jobs[job["job_id"]] = job
+            while len(self._jobs) > self.history:
+                self._jobs.popitem(last=False)
+            self._active = job
+            self._listeners[job["job_id"]] = [listener] if listener is not None else []
+            snapshot = self._snapshot(job)
+        threading.Thread(target=self._execute, args=(job,), name=f"poll-job-{job['job_id'][:8]}", daemon=True).start()
+        return snapshot, False
+
+    def _execute(self, job):
+        def progress(stage, info):
+            with self._lock:
+                job["stages"][stage] = dict(info)
+                listeners = list(self._listeners[job["job_id"]])
+            self._notify(listeners, stage, info)
+
+        with self._lock:
+            job["status"] = "running"
+            job["started_at"] = time.time()
+        try:
+            result = self.run(job["force"], progress)
+            with self._lock:
+                job["result"] = result
+                job["status"] = "completed"
+        except Exception as e:
+            print(f"Poll job {job['job_id']} failed: {e}")
+            with self._lock:
+                job["error"] = str(e)
+                job["status"] = "failed"
+        finally:
+            with self._lock:
+                job["finished_at"] = time.time()
+                if self._active is job:
+                    self._active = None
+                # Nobody can subscribe once the job is no longer active
+                listeners = self._listeners.pop(job["job_id"])
+            self._notify(listeners, "finished", {
+                "job_id": job["job_id"],
+                "status": job["status"],
+                "result": job["result"],
+                "error": job["error"]
+            })
+
+    @staticmethod
+    def _notify(listeners, stage, info):
+        for listener in listeners:
+            try:
+                listener(stage, info)
+            except Exception as e:
+                print(f"Error in poll job listener: {e}")
+
+    def unsubscribe(self, job_id, listener):
+        """Stop sending events of a job to a listener (e.g. a closed stream)"""
+        with self._lock:
+            listeners = self._listeners.get(job_id, [])
+            if listener in listeners:
+                listeners.remove(listener)
+
+    @staticmethod
+    def _snapshot(job):
+        snapshot = dict(job)
+        snapshot["stages"] = {stage: dict(info) for stage, info in job["stages"].items()}
+        return snapshot
+
+    def get(self, job_id):
+        """Status of one job, or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job is not None else None
+
+    def list(self):
+        """All remembered jobs, newest first, without their full results"""
+        with self._lock:
+            jobs = [self._snapshot(job) for job in reversed(self._jobs.values())]
+        for job in jobs:
+            job.pop("result")
+        return jobs
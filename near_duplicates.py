@@ -0,0 +1,168 @@
+"""Near-duplicate article detection: MinHash signatures of the content, grouped with banded LSH"""
+import hashlib
+import os
+import re
+import threading
+import time
+from array import array
+
+import state
+
+# 128 hashes in 16 bands of 8: articles with a shingle overlap (Jaccard) of 0.8
+# become candidates ~95% of the time, at 0.5 only ~6% of the time
+NUM_HASHES = 128
+BANDS = 16
+SHINGLE_WORDS = 5
+# Fewer shingles than this (a teaser, a photo caption) is too little to compare
+MIN_SHINGLES = 20
+
+WORD_RE = re.compile(r"[^\W_]+")
+_EMPTY = (1 << 64) - 1
+
+
+def shingle_hashes(text):
+    """64-bit hashes of the distinct SHINGLE_WORDS-word shingles of a text"""
+    words = WORD_RE.findall((text or "").lower())
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    return [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+            for shingle in shingles]
+
+
+def minhash_signature(text):
+    """MinHash signature of a text's shingles, or None if the text is too short
+
+    Uses one-permutation hashing: each shingle hash lands in one of NUM_HASHES
+    bins and every bin keeps its minimum, so the text is hashed once instead
+    of NUM_HASHES times. Empty bins borrow from the next filled bin to the
+    right (rotation densification), which keeps signatures comparable.
+    """
+    hashes = shingle_hashes(text)
+    if len(hashes) < MIN_SHINGLES:
+        return None
+    signature = [_EMPTY] * NUM_HASHES
+    for value in hashes:
+        slot = value % NUM_HASHES
+        value //= NUM_HASHES
+        if value < signature[slot]:
+            signature[slot] = value
+    for slot in range(NUM_HASHES):
+        if signature[slot] == _EMPTY:
+            for distance in range(1, NUM_HASHES):
+                borrowed = signature[(slot + distance) % NUM_HASHES]
+                if borrowed != _EMPTY:
+                    # Offset per distance so borrowed values don't collide by accident
+                    signature[slot] = (borrowed + distance * 0x9E3779B97F4A7C15) % _EMPTY
+                    break
+    return signature
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of the texts behind two signatures"""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_HASHES
+
+
+def band_buckets(signature):
+    """(band, bucket) pairs; texts sharing any of them are candidate duplicates"""
+    rows = NUM_HASHES // BANDS
+    # Hashes of int tuples are not randomized per process, so buckets can be stored
+    return [(band, hash(tuple(signature[band * rows:(band + 1) * rows]))) for band in range(BANDS)]
+
+
+class NearDuplicateIndex:
+    """Groups articles whose content is nearly the same (wire stories, press releases)
+
+    Every article is either the original of its cluster or points at one. An
+    article whose estimated similarity to an already indexed one reaches the
+    threshold (NEAR_DUPLICATE_THRESHOLD, default 0.8) joins that article's
+    cluster. Signatures and LSH buckets persist in STATE_DIR, so candidates
+    are found with a few indexed lookups instead of comparing to every article.
+    """
+
+    def __init__(self, filename="near_duplicates.sqlite3", threshold=None):
+        if threshold is None:
+            threshold = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = state.connect(filename)
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    link TEXT PRIMARY KEY,
+                    original TEXT NOT NULL,
+                    signature BLOB NOT NULL,
+                    added_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS buckets (
+                    band INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    link TEXT NOT NULL,
+                    PRIMARY KEY (band, bucket, link)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS buckets_link ON buckets (link);
+            """)
+
+    def _candidates(self, buckets, link):
+        found = set()
+        for band, bucket in buckets:
+            found.update(row[0] for row in self._conn.execute(
+                "SELECT link FROM buckets WHERE band = ? AND bucket = ? AND link != ?", (band, bucket, link)))
+        return found
+
+    def assign(self, link, text):
+        """Index an article; returns the link of the original it duplicates, or None"""
+        signature = minhash_signature(text)
+        if not link or signature is None:
+            return None
+        buckets = band_buckets(signature)
+        with self._lock:
+            best, best_similarity = None, self.threshold
+            for candidate in self._candidates(buckets, link):
+                row = self._conn.execute(
+                    "SELECT original, signature FROM articles WHERE link = ?", (candidate,)).fetchone()
+                if row is None:
+                    continue
+                score = similarity(signature, array("Q", row[1]))
+                if score >= best_similarity:
+                    best, best_similarity = row[0], score
+            # An original keeps its role when it is re-ingested
+            current = self._conn.execute("SELECT original FROM articles WHERE link = ?", (link,)).fetchone()
+            if current is not None and current[0] == link:
+                best = None
+            with self._conn:
+                self._conn.execute("DELETE FROM buckets WHERE link = ?", (link,))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO articles (link, original, signature, added_at) VALUES (?, ?, ?, ?)",
+                    (link, best or link, array("Q", signature).tobytes(), time.time())
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO buckets (band, bucket, link) VALUES (?, ?, ?)",
+                    [(band, bucket, link) for band, bucket in buckets]
+                )
+        return best
+
+    def cluster(self, link):
+        """Links of every article in the same cluster as link (the original first)"""
+        with self._lock:
+            row = self._conn.execute("SELECT original FROM articles WHERE link = ?", (link,)).fetchone()
+            if row is None:
+                return [link]
+            members = [member for (member,) in self._conn.execute(
+                "SELECT link FROM articles WHERE original = ? AND link != ? ORDER BY added_at", (row[0], row[0]))]
+            return [row[0]] + members
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+
+_near_duplicate_index = None
+_near_duplicate_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index():
+    """Return the process-wide near-duplicate index"""
+    global _near_duplicate_index
+    with _near_duplicate_index_lock:
+        if _near_duplicate_index is None:
+            _near_duplicate_index = NearDuplicateIndex()
+        return _near_duplicate_index
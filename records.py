@@ -0,0 +1,116 @@
+"""Typed article record and fast JSON encoding (orjson when installed)"""
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _text(value):
+    if value is None or isinstance(value, str):
+        return value
+    return str(value)
+
+
+def _timestamp(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _strings(values):
+    if values is None:
+        return None
+    if not values:
+        return []
+    if isinstance(values, str):
+        return [values]
+    return [value if isinstance(value, str) else str(value) for value in values]
+
+
+def json_safe(value):
+    """JSON-safe copy of any value in one pass: datetimes become ISO strings, other objects str()"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {str(key): json_safe(item) for key, item in value.items() if not callable(item)}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [json_safe(item) for item in value if not callable(item)]
+    return str(value)
+
+
+@dataclass(slots=True)
+class ArticleRecord:
+    """One row of the `data` table; every field is already JSON-safe"""
+
+    link: Optional[str]
+    title: Optional[str] = None
+    published: Optional[str] = None
+    author: Optional[str] = None
+    publisher: Optional[str] = None
+    description: Optional[str] = None
+    summary: Optional[str] = None
+    # Filled in later by the enrichment stage; None until then
+    keywords: Optional[List[str]] = None
+    content: Optional[str] = None
+    duplicate_of: Optional[str] = None
+
+    @classmethod
+    def from_entry(cls, entry, metadata=None):
+        """Merge an RSS entry with newspaper3k metadata (from article_metadata), preferring the latter"""
+        if metadata:
+            authors = metadata.get("authors")
+            author = authors[0] if authors else None
+            description = metadata.get("content")
+            return cls(
+                link=_text(entry.get("link")),
+                title=_text(metadata.get("title") or entry.get("title")),
+                published=_timestamp(metadata.get("publish_date")),
+                author=_text(author),
+                publisher=_text(metadata.get("publisher")),
+                description=_text(description),
+                summary=_text(metadata.get("summary")),
+                keywords=_strings(metadata.get("keywords")),
+                content=_text(description or entry.get("description"))
+            )
+        # Nothing extracted: fall back to what the feed itself says
+        author = entry.get("author") or entry.get("dc_creator") or entry.get("dc_contributor")
+        description = _text(entry.get("description"))
+        return cls(
+            link=_text(entry.get("link")),
+            title=_text(entry.get("title")),
+            published=_timestamp(entry.get("published")),
+            author=_text(author),
+            description=description,
+            content=description
+        )
+
+    def to_row(self):
+        """The record as a `data` table row"""
+        return {
+            "title": self.title,
+            "published": self.published,
+            "author": self.author,
+            "publisher": self.publisher,
+            "link": self.link,
+            "description": self.description,
+            "summary": self.summary,
+            "keywords": self.keywords,
+            "content": self.content,
+            "duplicate_of": self.duplicate_of
+        }
+
+
+def dumps(value):
+    """Encode a JSON-safe value to UTF-8 bytes, with orjson when it is available"""
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
@@ -0,0 +1,180 @@
+"""Background poll scheduler with adaptive per-feed intervals"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PollScheduler:
+    """Polls every feed on its own interval, adapted to how busy the feed is
+
+    After each run a feed's interval is set so that roughly `target_new`
+    articles are expected per poll, based on the feed's publish rate (from
+    entry timestamps, or from how many new rows the run wrote). Polls that
+    come back empty stretch the interval by `backoff`, errors too. Intervals
+    stay within [min_interval, max_interval] and get +/- `jitter` so feeds
+    drift apart. A feed is never started again while its previous run is
+    still going, and a run that finds the feed busy in another ingest (a
+    /poll job) leaves the schedule as it was.
+
+    ingest(rss_feeds) must return the result dict of ingest.ingest_feeds.
+    """
+
+    def __init__(self, rss_feeds, ingest, min_interval=None, max_interval=None,
+                 initial_interval=None, target_new=1.0, backoff=1.5, jitter=0.1, workers=None):
+        self.rss_feeds = dict(rss_feeds)
+        self.ingest = ingest
+        self.min_interval = min_interval if min_interval is not None else float(os.getenv("SCHEDULER_MIN_INTERVAL", "300"))
+        self.max_interval = max_interval if max_interval is not None else float(os.getenv("SCHEDULER_MAX_INTERVAL", "21600"))
+        self.initial_interval = initial_interval if initial_interval is not None else float(os.getenv("SCHEDULER_INITIAL_INTERVAL", "900"))
+        self.target_new = target_new
+        self.backoff = backoff
+        self.jitter = jitter
+        self.workers = workers if workers is not None else int(os.getenv("SCHEDULER_WORKERS", "2"))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+        self._feeds = {}
+
+    def _clamp(self, interval):
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def _jittered(self, interval):
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def start(self):
+        """Start the scheduler thread; first polls are spread over the first minute"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            now = time.monotonic()
+            self._feeds = {
+                feed_name: {
+                    "url": feed_url,
+                    "interval": self._clamp(self.initial_interval),
+                    "next_run": now + random.uniform(0, min(60, self.initial_interval)),
+                    "running": False,
+                    "runs": 0,
+                    "empty_streak": 0,
+                    "rate_per_hour": None,
+                    "last_run": None,
+                    "last_inserted": None,
+                    "last_error": None
+                }
+                for feed_name, feed_url in self.rss_feeds.items()
+            }
+            self._stop.clear()
+            self._executor = ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="poll-scheduler")
+            self._thread = threading.Thread(target=self._loop, name="poll-scheduler", daemon=True)
+            self._thread.start()
+        print(f"Poll scheduler started for {len(self.rss_feeds)} feeds")
+
+    def stop(self):
+        """Stop scheduling; runs already in progress are allowed to finish"""
+        with self._lock:
+            thread, executor = self._thread, self._executor
+            self._thread = None
+            self._executor = None
+        self._stop.set()
+        if thread is not None:
+            thread.join()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            next_wake = now + 60
+            with self._lock:
+                if self._executor is None:
+                    break
+                for feed_name, feed in self._feeds.items():
+                    if feed["running"]:
+                        continue
+                    if feed["next_run"] <= now:
+                        # Overlap guard: cleared again when the run finishes
+                        feed["running"] = True
+                        self._executor.submit(self._run_feed, feed_name)
+                    else:
+                        next_wake = min(next_wake, feed["next_run"])
+            self._stop.wait(max(1.0, next_wake - now))
+
+    def _run_feed(self, feed_name):
+        feed = self._feeds[feed_name]
+        started = time.time()
+        result = None
+        error = None
+        try:
+            result = self.ingest({feed_name: feed["url"]})
+        except Exception as e:
+            error = str(e)
+            print(f"Scheduled poll of {feed_name} failed: {e}")
+        with self._lock:
+            if result is not None and feed_name in result.get("feeds_busy", ()):
+                # Polled by someone else just now: nothing learned, wait a regular interval
+                feed["next_run"] = time.monotonic() + self._jittered(feed["interval"])
+                feed["running"] = False
+                return
+            if result is not None:
+                stats = result.get("feed_statistics", {}).get(feed_name, {})
+                error = stats.get("error")
+                feed["last_inserted"] = result.get("articles_inserted", 0)
+            feed["interval"] = self._next_interval(feed_name, feed, result, error, started)
+            feed["next_run"] = time.monotonic() + self._jittered(feed["interval"])
+            feed["last_run"] = started
+            feed["last_error"] = error
+            feed["runs"] += 1
+            feed["running"] = False
+
+    def _next_interval(self, feed_name, feed, result, error, started):
+        if error is not None or result is None:
+            return self._clamp(feed["interval"] * self.backoff)
+
+        stats = result.get("feed_statistics", {}).get(feed_name, {})
+        new_articles = result.get("articles_inserted", 0)
+
+        # Prefer the rate the feed itself shows; otherwise what this run found
+        observed = stats.get("publish_rate_per_hour")
+        if observed is None and feed["last_run"] is not None:
+            elapsed_hours = (started - feed["last_run"]) / 3600
+            if elapsed_hours > 0:
+                observed = new_articles / elapsed_hours
+        if observed is not None:
+            rate = feed["rate_per_hour"]
+            feed["rate_per_hour"] = observed if rate is None else 0.3 * observed + 0.7 * rate
+
+        interval = feed["interval"]
+        if feed["rate_per_hour"]:
+            interval = self.target_new * 3600 / feed["rate_per_hour"]
+
+        if new_articles:
+            feed["empty_streak"] = 0
+        else:
+            feed["empty_streak"] += 1
+            interval = max(interval, feed["interval"] * self.backoff)
+        return self._clamp(interval)
+
+    def status(self):
+        """Per-feed schedule, for the /scheduler endpoint"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "running": self._thread is not None,
+                "feeds": {
+                    feed_name: {
+                        "url": feed["url"],
+                        "interval_seconds": round(feed["interval"], 1),
+                        "next_run_in_seconds": None if feed["running"] else round(max(0, feed["next_run"] - now), 1),
+                        "polling": feed["running"],
+                        "runs": feed["runs"],
+                        "empty_streak": feed["empty_streak"],
+                        "publish_rate_per_hour": round(feed["rate_per_hour"], 3) if feed["rate_per_hour"] is not None else None,
+                        "last_run": feed["last_run"],
+                        "last_inserted": feed["last_inserted"],
+                        "last_error": feed["last_error"]
+                    }
+                    for feed_name, feed in self._feeds.items()
+                }
+            }
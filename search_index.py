@@ -0,0 +1,307 @@
+"""Inverted full-text index with BM25 ranking for the article search box"""
+import bisect
+import heapq
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from collections.abc import Sequence
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+# Words too common to be useful; skipping them keeps posting lists short
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i in is it its of on or
+our she that the their they this to was we were which will with you
+""".split())
+
+TITLE_WEIGHT = 2
+MIN_PREFIX_LENGTH = 2
+# A short prefix can match thousands of terms; the ones in the most documents are kept
+MAX_PREFIX_TERMS = 64
+RESULT_CACHE_SIZE = 64
+# Re-derive BM25 length normalisation once the average document length drifts this much
+AVERAGE_LENGTH_DRIFT = 0.1
+
+
+def tokenize(text):
+    """Lowercase word tokens of a text, without stopwords"""
+    if not text:
+        return []
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def article_terms(article):
+    """Term frequencies for an article; title terms count TITLE_WEIGHT times"""
+    terms = Counter()
+    for token in tokenize(article.get("title")):
+        terms[token] += TITLE_WEIGHT
+    content = article.get("content")
+    description = article.get("description")
+    terms.update(tokenize(content))
+    # description is usually a copy of content, don't count it twice
+    if description and description != content:
+        terms.update(tokenize(description))
+    return terms
+
+
+def article_key(article):
+    """Identity of an article inside the index"""
+    key = article.get("id")
+    return key if key is not None else article.get("link")
+
+
+class SearchResults(Sequence):
+    """Ranked search hits with the articles they had when the search ran"""
+
+    def __init__(self, keys, docs):
+        self._keys = keys
+        self._docs = docs
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._docs[key] for key in self._keys[index]]
+        return self._docs[self._keys[index]]
+
+    def keys(self):
+        """Article keys in rank order"""
+        return self._keys
+
+
+class SearchIndex:
+    """BM25-ranked inverted index over title, content and description
+
+    Every query term must match; the last one also matches as a prefix so
+    results update while the user is still typing. sync() updates the index
+    incrementally from the current article list, re-tokenizing only articles
+    that are new or changed.
+
+    Per-term BM25 weights and recent query results are cached and dropped
+    when the documents behind them change, so paging through the results of
+    one query does not re-score it.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings = {}      # term -> {key: term frequency}
+        self._doc_terms = {}     # key -> terms, needed to remove a document
+        self._doc_lengths = {}   # key -> number of indexed tokens
+        self._docs = {}          # key -> article
+        self._signatures = {}    # key -> signature of the indexed text
+        self._recency = {}       # key -> created_at, breaks score ties newest first
+        self._total_length = 0
+        self._sorted_terms = []
+        self._terms_dirty = False
+        self._average_length = None
+        self._weights = {}       # term -> {key: BM25 term weight}, built on demand
+        self._ranked_terms = {}  # term -> keys ordered by weight, built on demand
+        self._results = OrderedDict()
+
+    def __len__(self):
+        return len(self._docs)
+
+    @staticmethod
+    def _signature(article):
+        return hash((article.get("title"), article.get("description"), article.get("content")))
+
+    def _weight(self, frequency, length):
+        k1, b = self.k1, self.b
+        return frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / self._average_length))
+
+    def add(self, article):
+        """Index (or re-index) one article"""
+        key = article_key(article)
+        if key is None:
+            return
+        with self._lock:
+            if key in self._docs:
+                self._remove(key)
+            terms = article_terms(article)
+            length = sum(terms.values())
+            for term, frequency in terms.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    self._terms_dirty = True
+                postings[key] = frequency
+                # Keep cached weights current instead of recomputing whole terms
+                weights = self._weights.get(term)
+                if weights is not None:
+                    weights[key] = self._weight(frequency, length)
+                self._ranked_terms.pop(term, None)
+            self._doc_terms[key] = tuple(terms)
+            self._doc_lengths[key] = length
+            self._docs[key] = article
+            self._signatures[key] = self._signature(article)
+            self._recency[key] = article.get("created_at") or ""
+            self._total_length += length
+            self._results.clear()
+
+    def remove(self, key):
+        """Drop an article from the index"""
+        with self._lock:
+            if key in self._docs:
+                self._remove(key)
+
+    def _remove(self, key):
+        terms = self._doc_terms.pop(key)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[key]
+            if not postings:
+                del self._postings[term]
+                self._weights.pop(term, None)
+                self._terms_dirty = True
+            else:
+                weights = self._weights.get(term)
+                if weights is not None:
+                    del weights[key]
+            self._ranked_terms.pop(term, None)
+        self._total_length -= self._doc_lengths.pop(key)
+        del self._docs[key]
+        del self._signatures[key]
+        del self._recency[key]
+        self._results.clear()
+
+    def sync(self, articles):
+        """Bring the index in line with the current article list"""
+        with self._lock:
+            current = set()
+            for article in articles:
+                key = article_key(article)
+                if key is None:
+                    continue
+                current.add(key)
+                if self._signatures.get(key) != self._signature(article):
+                    self.add(article)
+                else:
+                    # Same text; keep the latest copy of the other fields
+                    self._docs[key] = article
+            for key in [key for key in self._docs if key not in current]:
+                self._remove(key)
+
+    def _check_average_length(self):
+        average = self._total_length / len(self._docs) if self._docs else 1
+        frozen = self._average_length
+        if not frozen or abs(average - frozen) / frozen > AVERAGE_LENGTH_DRIFT:
+            self._average_length = average or 1
+            self._weights.clear()
+            self._ranked_terms.clear()
+            self._results.clear()
+
+    def _term_weights(self, term):
+        weights = self._weights.get(term)
+        if weights is None:
+            lengths = self._doc_lengths
+            weight = self._weight
+            weights = {key: weight(frequency, lengths[key]) for key, frequency in self._postings[term].items()}
+            self._weights[term] = weights
+        return weights
+
+    def _ranked_term(self, term):
+        ranked = self._ranked_terms.get(term)
+        if ranked is None:
+            weights = self._term_weights(term)
+            ranked = sorted(weights, key=self._recency.__getitem__, reverse=True)
+            ranked.sort(key=weights.__getitem__, reverse=True)
+            self._ranked_terms[term] = ranked
+        return ranked
+
+    def _idf(self, term):
+        matches = len(self._postings[term])
+        return math.log(1 + (len(self._docs) - matches + 0.5) / (matches + 0.5))
+
+    def _expand_prefix(self, prefix):
+        if self._terms_dirty:
+            self._sorted_terms = sorted(self._postings)
+            self._terms_dirty = False
+        start = bisect.bisect_left(self._sorted_terms, prefix)
+        end = bisect.bisect_left(self._sorted_terms, prefix + "\U0010ffff", start)
+        matches = self._sorted_terms[start:end]
+        if len(matches) > MAX_PREFIX_TERMS:
+            postings = self._postings
+            matches = heapq.nlargest(MAX_PREFIX_TERMS, matches, key=lambda term: len(postings[term]))
+        return matches
+
+    def search(self, query):
+        """Return matching articles, best BM25 score first, as SearchResults
+
+        Returns None when the query has no searchable terms, meaning
+        "don't filter".
+        """
+        terms = tokenize(query)
+        if not terms:
+            return None
+        cache_key = tuple(terms)
+        with self._lock:
+            keys = self._results.get(cache_key)
+            if keys is None:
+                keys = self._rank(terms)
+                self._results[cache_key] = keys
+                if len(self._results) > RESULT_CACHE_SIZE:
+                    self._results.popitem(last=False)
+            else:
+                self._results.move_to_end(cache_key)
+            # A copy: a later sync() must not change or drop the articles of these results
+            docs = self._docs
+            return SearchResults(keys, {key: docs[key] for key in keys})
+
+    def _rank(self, terms):
+        if not self._docs:
+            return []
+        self._check_average_length()
+
+        # Each query position is a group of index terms (several for a prefix)
+        groups = [[term] if term in self._postings else [] for term in terms[:-1]]
+        last = terms[-1]
+        if len(last) >= MIN_PREFIX_LENGTH:
+            groups.append(self._expand_prefix(last))
+        else:
+            groups.append([last] if last in self._postings else [])
+        if not all(groups):
+            return []
+
+        exact = list(dict.fromkeys(group[0] for group in groups if len(group) == 1))
+        prefix_groups = [group for group in groups if len(group) > 1]
+        if len(exact) == 1 and not prefix_groups:
+            # Single term: the ranking only depends on that term's weights
+            return self._ranked_term(exact[0])
+
+        # Intersect from the most selective group
+        group_docs = []
+        for group in groups:
+            if len(group) == 1:
+                group_docs.append(self._postings[group[0]].keys())
+            else:
+                docs = set()
+                for term in group:
+                    docs.update(self._postings[term])
+                group_docs.append(docs)
+        group_docs.sort(key=len)
+        candidates = set(group_docs[0])
+        for docs in group_docs[1:]:
+            candidates.intersection_update(docs)
+            if not candidates:
+                return []
+
+        scores = dict.fromkeys(candidates, 0.0)
+        for term in exact:
+            idf = self._idf(term)
+            weights = self._term_weights(term)
+            for key in candidates:
+                scores[key] += idf * weights[key]
+        for group in prefix_groups:
+            for term in group:
+                idf = self._idf(term)
+                weights = self._term_weights(term)
+                for key in candidates.intersection(weights):
+                    scores[key] += idf * weights[key]
+
+        ranked = sorted(candidates, key=self._recency.__getitem__, reverse=True)
+        ranked.sort(key=scores.__getitem__, reverse=True)
+        return ranked
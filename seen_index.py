@@ -0,0 +1,182 @@
+"""Persistent index of RSS entries that have already been ingested"""
+import hashlib
+import os
+import threading
+import time
+
+import state
+
+
+def entry_key(entry):
+    """Stable identity for an RSS entry: its GUID, falling back to the link"""
+    return entry.get('id') or entry.get('link')
+
+
+def entry_fingerprint(entry):
+    """Hash of the entry's `updated` value (or the closest thing the feed provides)"""
+    value = entry.get('updated') or entry.get('published')
+    if not value:
+        value = f"{entry.get('title', '')}\n{entry.get('summary', '')}"
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+
+class SeenIndex:
+    """Tracks which entries have been written to the database and in which version
+
+    Entries whose key and fingerprint match the index are skipped before any
+    network call; entries whose fingerprint changed are re-extracted and
+    upserted over the existing row.
+
+    Entries whose article could not be extracted are recorded with fail()
+    and retried with a growing delay (retry_delay, doubled per attempt),
+    up to max_attempts (EXTRACT_MAX_ATTEMPTS, default 5); until their retry
+    is due, split() skips them like ingested entries.
+    """
+
+    def __init__(self, filename="seen_index.sqlite3", max_attempts=None, retry_delay=None):
+        if max_attempts is None:
+            max_attempts = int(os.getenv("EXTRACT_MAX_ATTEMPTS", "5"))
+        if retry_delay is None:
+            retry_delay = float(os.getenv("EXTRACT_RETRY_DELAY", "900"))
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._conn = state.connect(filename)
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS seen_entries (
+                    entry_key TEXT PRIMARY KEY,
+                    link TEXT,
+                    fingerprint TEXT NOT NULL,
+                    seen_at REAL
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS failed_entries (
+                    entry_key TEXT PRIMARY KEY,
+                    feed_name TEXT,
+                    fingerprint TEXT NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    retry_at REAL NOT NULL,
+                    fallback_stored INTEGER NOT NULL DEFAULT 0
+                )"""
+            )
+
+    def split(self, entries):
+        """Split entries into (to_process, unchanged_count)"""
+        keyed = [(entry_key(entry), entry) for entry in entries]
+        keys = [key for key, _ in keyed if key]
+        known = {}
+        waiting = {}
+        now = time.time()
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT entry_key, fingerprint FROM seen_entries WHERE entry_key IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                known.update(rows)
+                # Failed entries whose next attempt is not due yet
+                rows = self._conn.execute(
+                    f"SELECT entry_key, fingerprint FROM failed_entries WHERE entry_key IN ({placeholders}) "
+                    "AND retry_at > ?",
+                    chunk + [now]
+                ).fetchall()
+                waiting.update(rows)
+
+        to_process = []
+        unchanged = 0
+        queued = set()
+        for key, entry in keyed:
+            fingerprint = entry_fingerprint(entry)
+            if key and fingerprint in (known.get(key), waiting.get(key)):
+                unchanged += 1
+            elif key and key in queued:
+                # Same article listed twice in this feed
+                unchanged += 1
+            else:
+                if key:
+                    queued.add(key)
+                to_process.append(entry)
+        return to_process, unchanged
+
+    def mark(self, entry):
+        """Record that the current version of an entry has been written"""
+        key = entry_key(entry)
+        if not key:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO seen_entries (entry_key, link, fingerprint, seen_at)
+                   VALUES (?, ?, ?, ?)""",
+                (key, entry.get('link'), entry_fingerprint(entry), time.time())
+            )
+            self._conn.execute("DELETE FROM failed_entries WHERE entry_key = ?", (key,))
+
+    def fail(self, entry, feed_name, count=True):
+        """Record a failed attempt at an entry; returns (attempts at this version, fallback_stored)
+
+        The entry is retried once retry_delay * 2 ** (attempts - 1) seconds
+        have passed; with count=False (the site was paused, or only the
+        write failed) it is retried on the next poll and no attempt is used.
+        A changed entry starts over at attempt 1. fallback_stored tells
+        whether fallback_written() was called for this version.
+        """
+        key = entry_key(entry)
+        if not key:
+            return self.max_attempts, True
+        fingerprint = entry_fingerprint(entry)
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT fingerprint, attempts, fallback_stored FROM failed_entries WHERE entry_key = ?",
+                (key,)).fetchone()
+            attempts, stored = (row[1], row[2]) if row is not None and row[0] == fingerprint else (0, 0)
+            if count:
+                attempts += 1
+            delay = self.retry_delay * 2 ** (attempts - 1) if count else 0
+            self._conn.execute(
+                """INSERT OR REPLACE INTO failed_entries
+                   (entry_key, feed_name, fingerprint, attempts, retry_at, fallback_stored)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (key, feed_name, fingerprint, attempts, time.time() + delay, stored)
+            )
+        return attempts, bool(stored)
+
+    def fallback_written(self, entry):
+        """Record that a failed entry's fallback row (what the feed says) is in the store"""
+        key = entry_key(entry)
+        if not key:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE failed_entries SET fallback_stored = 1 WHERE entry_key = ? AND fingerprint = ?",
+                (key, entry_fingerprint(entry))
+            )
+
+    def due_feeds(self):
+        """Feeds with failed entries whose retry is due"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT feed_name FROM failed_entries WHERE retry_at <= ? AND feed_name IS NOT NULL",
+                (time.time(),)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen_entries").fetchone()[0]
+
+
+_seen_index = None
+_seen_index_lock = threading.Lock()
+
+def get_seen_index():
+    """Return the process-wide seen-article index"""
+    global _seen_index
+    with _seen_index_lock:
+        if _seen_index is None:
+            _seen_index = SeenIndex()
+        return _seen_index
@@ -0,0 +1,22 @@
+"""Local persistent state used by the ingest pipeline (caches and indexes)"""
+import os
+import sqlite3
+
+
+def state_path(filename):
+    """Path of a state file inside STATE_DIR (defaults to ./state)"""
+    directory = os.getenv("STATE_DIR", "state")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, filename)
+
+
+def connect(filename):
+    """Open a SQLite state database that can be shared between threads
+
+    Callers serialize access with their own lock; WAL keeps readers in other
+    processes from blocking the poller.
+    """
+    conn = sqlite3.connect(state_path(filename), check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
@@ -0,0 +1,490 @@
+"""Article storage backends: hosted Supabase or an embedded SQLite database"""
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import state
+
+# Columns of the `data` table, in the order the schema declares them
+COLUMNS = ["id", "created_at", "title", "published", "author", "publisher", "link",
+           "description", "summary", "keywords", "content", "duplicate_of"]
+# Stored as JSON text in SQLite, native arrays in Postgres
+JSON_COLUMNS = {"keywords"}
+# Shorter searches can't use the trigram index and fall back to LIKE
+MIN_FTS_LENGTH = 3
+
+
+class ChangeCursorExpired(Exception):
+    """A changes() position from another database; the caller has to reload everything"""
+
+
+def quote_filter_value(value):
+    """Quote a value for use inside a PostgREST or=(...) filter"""
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class ArticleStore:
+    """Where article rows live
+
+    Rows are plain dicts keyed by column name. list() returns rows newest
+    first, ordered on (created_at, id) so `after` can continue from the last
+    row of the previous page; `search` keeps rows whose title, description or
+    content contain the text (case-insensitive).
+    """
+
+    name = None
+
+    def upsert(self, rows, on_conflict="link"):
+        """Insert rows, replacing existing rows with the same on_conflict value"""
+        raise NotImplementedError
+
+    def insert(self, row):
+        """Insert a single row and return it as stored (with id and created_at)"""
+        raise NotImplementedError
+
+    def update(self, row_id, fields):
+        """Set some columns of the row with this id; a row that no longer exists is left alone"""
+        raise NotImplementedError
+
+    def list(self, columns=None, limit=None, after=None, publisher=None, search=None):
+        """Rows newest first; after is the (created_at, id) of the previous page's last row"""
+        raise NotImplementedError
+
+    def columns(self):
+        """Column names of the article table"""
+        raise NotImplementedError
+
+    def version(self):
+        """Opaque string that changes whenever rows are written (used for ETags)"""
+        raise NotImplementedError
+
+    def changes(self, since=None, columns=None, limit=None):
+        """Rows written after the position since, oldest change first, and the new position
+
+        Positions are opaque strings; since=None returns no rows, just the
+        current position. A row may be returned again by a later call. Raises ChangeCursorExpired if since can no longer
+        be resumed from.
+        """
+        raise NotImplementedError
+
+    def without_summary(self, columns=None, limit=None, after_id=None):
+        """Rows with text but no summary yet, in id order, after the row with id after_id"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SupabaseStore(ArticleStore):
+    """The `data` table of the hosted Supabase project, through PostgREST"""
+
+    name = "supabase"
+
+    def __init__(self, table="data"):
+        # Imported here so the SQLite backend works without the Supabase client installed
+        from db import close_supabase, get_supabase
+        from postgrest.types import ReturnMethod
+        self.table = table
+        self._get_client = get_supabase
+        self._close_client = close_supabase
+        self._minimal = ReturnMethod.minimal
+        self._version_table = True
+        self._get_client()
+
+    def upsert(self, rows, on_conflict="link"):
+        self._get_client().table(self.table).upsert(
+            rows, on_conflict=on_conflict, returning=self._minimal
+        ).execute()
+
+    def insert(self, row):
+        result = self._get_client().table(self.table).insert(row).execute()
+        return result.data[0] if result.data else None
+
+    def update(self, row_id, fields):
+        self._get_client().table(self.table).update(fields, returning=self._minimal).eq("id", row_id).execute()
+
+    def list(self, columns=None, limit=None, after=None, publisher=None, search=None):
+        query = self._get_client().table(self.table).select(", ".join(columns) if columns else "*")
+        if publisher:
+            query = query.eq("publisher", publisher)
+        if search:
+            pattern = quote_filter_value(f"*{search}*")
+            query = query.or_(f"title.ilike.{pattern},description.ilike.{pattern},content.ilike.{pattern}")
+        if after:
+            created_at, row_id = after
+            created_at = quote_filter_value(created_at)
+            query = query.or_(f"created_at.lt.{created_at},and(created_at.eq.{created_at},id.lt.{row_id})")
+        query = query.order("created_at", desc=True).order("id", desc=True)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.execute().data or []
+
+    def columns(self):
+        # PostgREST does not expose the schema to the anon key, look at a row
+        rows = self._get_client().table(self.table).select("*").limit(1).execute().data
+        return list(rows[0].keys()) if rows else []
+
+    def version(self):
+        # A counter that a trigger bumps on every insert, update and delete
+        # (see the README), whoever writes: one row to read, however big the
+        # table. Without it, fall back to the newest row, which misses updates
+        # and deletes.
+        from postgrest.exceptions import APIError
+        client = self._get_client()
+        if self._version_table:
+            try:
+                rows = client.table(f"{self.table}_version").select("version").limit(1).execute().data
+                return f"v{rows[0]['version']}" if rows else "empty"
+            except APIError as e:
+                self._version_table = False
+                print(f"No {self.table}_version table ({e}), /list ETags will miss updates and deletes")
+        rows = client.table(self.table).select("id, created_at").order(
+            "created_at", desc=True).order("id", desc=True).limit(1).execute().data
+        return f"{rows[0]['created_at']}/{rows[0]['id']}" if rows else "empty"
+
+    def changes(self, since=None, columns=None, limit=None):
+        # Keyed on (updated_at, id), both kept by the table itself; an empty
+        # position means the beginning. updated_at is stamped when a row is
+        # written, not when its transaction commits, so a row can show up
+        # behind a position already handed out; see _recheck_window.
+        table = self._get_client().table(self.table)
+        if since is None:
+            rows = table.select("id, updated_at").order("updated_at", desc=True).order(
+                "id", desc=True).limit(1).execute().data
+            return [], f"{rows[0]['updated_at']}|{rows[0]['id']}" if rows else ""
+        columns = list(dict.fromkeys(list(columns or COLUMNS) + ["id", "updated_at"]))
+        query = table.select(", ".join(columns))
+        if since:
+            try:
+                updated_at, row_id = since.rsplit("|", 1)
+                row_id = int(row_id)
+            except ValueError:
+                raise ValueError(f"Invalid changes position {since!r}")
+            updated_at = quote_filter_value(updated_at)
+            query = query.or_(f"updated_at.gt.{updated_at},and(updated_at.eq.{updated_at},id.gt.{row_id})")
+        query = query.order("updated_at").order("id")
+        if limit is not None:
+            query = query.limit(limit)
+        rows = query.execute().data or []
+        position = f"{rows[-1]['updated_at']}|{rows[-1]['id']}" if rows else since
+        if since and (limit is None or len(rows) < limit - 1):
+            # Caught up: also send what landed just behind the position
+            rows = self._recheck_window(table, columns, since, rows, None if limit is None else limit - len(rows) - 1) + rows
+        return rows, position
+
+    def _recheck_window(self, table, columns, since, rows, limit):
+        # Rows stamped up to CHANGES_OVERLAP_SECONDS before the position: a
+        # write that committed late lands there. They are sent again and the
+        # caller merges them by id. Kept short of a full page, so has_more
+        # stays false and the caller does not loop on the same rows.
+        overlap = float(os.getenv("CHANGES_OVERLAP_SECONDS", "30"))
+        if overlap <= 0 or limit == 0:
+            return []
+        updated_at, row_id = since.rsplit("|", 1)
+        try:
+            start = datetime.fromisoformat(updated_at) - timedelta(seconds=overlap)
+        except ValueError:
+            return []
+        end = quote_filter_value(updated_at)
+        query = table.select(", ".join(columns)).gte("updated_at", start.isoformat())
+        query = query.or_(f"updated_at.lt.{end},and(updated_at.eq.{end},id.lte.{int(row_id)})")
+        query = query.order("updated_at").order("id")
+        if limit is not None:
+            query = query.limit(limit)
+        seen = {row["id"] for row in rows}
+        recent = query.execute().data or []
+        return [row for row in recent if row["id"] not in seen]
+
+    def without_summary(self, columns=None, limit=None, after_id=None):
+        query = self._get_client().table(self.table).select(", ".join(columns) if columns else "*")
+        query = query.is_("summary", "null").not_.is_("content", "null").neq("content", "")
+        if after_id:
+            query = query.gt("id", after_id)
+        query = query.order("id")
+        if limit is not None:
+            query = query.limit(limit)
+        return query.execute().data or []
+
+    def close(self):
+        self._close_client()
+
+
+class SQLiteStore(ArticleStore):
+    """Articles in a local SQLite database (WAL) with an FTS5 trigram index
+
+    Each thread gets its own connection, so reads never wait on each other
+    or on the poller. The trigram index answers the same substring searches
+    as Postgres ilike; searches shorter than three characters use LIKE.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, filename="articles.sqlite3"):
+        self.filename = filename
+        self.fts = False
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._create_schema(self._connection())
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = state.connect(self.filename)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _create_schema(self, conn):
+        with conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS data (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+                    title TEXT,
+                    published TEXT,
+                    author TEXT,
+                    publisher TEXT,
+                    link TEXT UNIQUE,
+                    description TEXT,
+                    summary TEXT,
+                    keywords TEXT,
+                    content TEXT
+                );
+                CREATE INDEX IF NOT EXISTS data_recent ON data (created_at DESC, id DESC);
+                CREATE INDEX IF NOT EXISTS data_publisher_recent ON data (publisher, created_at DESC, id DESC);
+                CREATE TABLE IF NOT EXISTS data_meta (
+                    key TEXT PRIMARY KEY,
+                    value NOT NULL
+                );
+            """)
+            # A fresh database gets a new id, so versions never repeat across databases
+            conn.execute("INSERT OR IGNORE INTO data_meta (key, value) VALUES ('instance', ?)", (uuid.uuid4().hex,))
+            conn.execute("INSERT OR IGNORE INTO data_meta (key, value) VALUES ('version', 0)")
+            # Columns added since the table was first created: the version of the
+            # write that last touched each row (for changes()), and the link of the
+            # article a near-duplicate row repeats
+            existing = [row[1] for row in conn.execute("PRAGMA table_info(data)")]
+            for column, definition in (("version", "INTEGER NOT NULL DEFAULT 0"), ("duplicate_of", "TEXT")):
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE data ADD COLUMN {column} {definition}")
+            conn.execute("CREATE INDEX IF NOT EXISTS data_changes ON data (version, id)")
+            # Only rows still waiting for enrichment, so the index stays small
+            conn.execute("CREATE INDEX IF NOT EXISTS data_without_summary ON data (id) WHERE summary IS NULL")
+            try:
+                conn.executescript("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS data_fts USING fts5(
+                        title, description, content,
+                        content='data', content_rowid='id', tokenize='trigram'
+                    );
+                    CREATE TRIGGER IF NOT EXISTS data_fts_insert AFTER INSERT ON data BEGIN
+                        INSERT INTO data_fts(rowid, title, description, content)
+                        VALUES (new.id, new.title, new.description, new.content);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS data_fts_delete AFTER DELETE ON data BEGIN
+                        INSERT INTO data_fts(data_fts, rowid, title, description, content)
+                        VALUES ('delete', old.id, old.title, old.description, old.content);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS data_fts_update AFTER UPDATE ON data BEGIN
+                        INSERT INTO data_fts(data_fts, rowid, title, description, content)
+                        VALUES ('delete', old.id, old.title, old.description, old.content);
+                        INSERT INTO data_fts(rowid, title, description, content)
+                        VALUES (new.id, new.title, new.description, new.content);
+                    END;
+                """)
+                self.fts = True
+            except sqlite3.OperationalError as e:
+                # FTS5 or its trigram tokenizer (SQLite 3.34+) is not compiled in
+                print(f"SQLite full-text search unavailable, searching with LIKE: {e}")
+
+    @staticmethod
+    def _check_columns(columns):
+        unknown = [column for column in columns if column not in COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+
+    @staticmethod
+    def _encode(column, value):
+        # SQLite has no array type; lists (keywords, sometimes author) go in as JSON
+        if isinstance(value, (list, dict)) or (column in JSON_COLUMNS and value is not None):
+            return json.dumps(value)
+        return value
+
+    @staticmethod
+    def _bump_version(conn):
+        # Same transaction as the write, so readers never see new rows with an old version,
+        # and versions commit in order because SQLite has a single writer
+        return conn.execute("UPDATE data_meta SET value = value + 1 WHERE key = 'version' RETURNING value").fetchone()[0]
+
+    @staticmethod
+    def _decode(row):
+        article = dict(row)
+        for column in JSON_COLUMNS:
+            value = article.get(column)
+            if value is not None:
+                article[column] = json.loads(value)
+        return article
+
+    def upsert(self, rows, on_conflict="link"):
+        if not rows:
+            return
+        columns = list(dict.fromkeys(column for row in rows for column in row))
+        self._check_columns(columns + [on_conflict])
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns + ["version"] if column != on_conflict)
+        sql = (f"INSERT INTO data ({', '.join(columns)}, version) VALUES ({', '.join('?' * (len(columns) + 1))}) "
+               f"ON CONFLICT ({on_conflict}) DO UPDATE SET {updates}")
+        conn = self._connection()
+        with conn:
+            version = self._bump_version(conn)
+            conn.executemany(sql, [[self._encode(column, row.get(column)) for column in columns] + [version]
+                                   for row in rows])
+
+    def update(self, row_id, fields):
+        columns = list(fields)
+        self._check_columns(columns)
+        assignments = ", ".join(f"{column} = ?" for column in columns + ["version"])
+        conn = self._connection()
+        with conn:
+            version = self._bump_version(conn)
+            conn.execute(f"UPDATE data SET {assignments} WHERE id = ?",
+                         [self._encode(column, fields[column]) for column in columns] + [version, row_id])
+
+    def insert(self, row):
+        columns = list(row)
+        self._check_columns(columns)
+        conn = self._connection()
+        with conn:
+            version = self._bump_version(conn)
+            cursor = conn.execute(
+                f"INSERT INTO data ({', '.join(columns)}, version) VALUES ({', '.join('?' * (len(columns) + 1))}) "
+                f"RETURNING {', '.join(COLUMNS)}",
+                [self._encode(column, row[column]) for column in columns] + [version]
+            )
+            return self._decode(cursor.fetchone())
+
+    def list(self, columns=None, limit=None, after=None, publisher=None, search=None):
+        columns = list(columns) if columns else COLUMNS
+        self._check_columns(columns)
+        where = []
+        params = []
+        if publisher:
+            where.append("publisher = ?")
+            params.append(publisher)
+        if search:
+            if self.fts and len(search) >= MIN_FTS_LENGTH:
+                where.append("id IN (SELECT rowid FROM data_fts WHERE data_fts MATCH ?)")
+                params.append('"' + search.replace('"', '""') + '"')
+            else:
+                pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                where.append("(title LIKE ? ESCAPE '\\' OR description LIKE ? ESCAPE '\\' OR content LIKE ? ESCAPE '\\')")
+                params += [pattern] * 3
+        if after:
+            where.append("(created_at, id) < (?, ?)")
+            params += list(after)
+        sql = f"SELECT {', '.join(columns)} FROM data"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._decode(row) for row in self._connection().execute(sql, params)]
+
+    def columns(self):
+        return [row["name"] for row in self._connection().execute("PRAGMA table_info(data)")]
+
+    def _meta(self):
+        return dict(self._connection().execute("SELECT key, value FROM data_meta").fetchall())
+
+    def version(self):
+        meta = self._meta()
+        return f"{meta['instance']}/{meta['version']}"
+
+    def changes(self, since=None, columns=None, limit=None):
+        # Positions are instance/version[/id]: after that row of the version, or after the whole version
+        meta = self._meta()
+        if since is None:
+            return [], f"{meta['instance']}/{meta['version']}"
+        try:
+            instance, version, *row_id = since.split("/")
+            version = int(version)
+            row_id = int(row_id[0]) if row_id else None
+        except ValueError:
+            raise ValueError(f"Invalid changes position {since!r}")
+        if instance != meta["instance"]:
+            raise ChangeCursorExpired(f"Position {since!r} is from another database")
+        columns = list(dict.fromkeys(list(columns or COLUMNS) + ["id"]))
+        self._check_columns(columns)
+        if row_id is None:
+            sql, params = "version > ?", [version]
+        else:
+            sql, params = "(version, id) > (?, ?)", [version, row_id]
+        sql = f"SELECT {', '.join(columns)}, version AS _version FROM data WHERE {sql} ORDER BY version, id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = [self._decode(row) for row in self._connection().execute(sql, params)]
+        if rows:
+            since = f"{meta['instance']}/{rows[-1]['_version']}/{rows[-1]['id']}"
+        for row in rows:
+            del row["_version"]
+        return rows, since
+
+    def without_summary(self, columns=None, limit=None, after_id=None):
+        columns = list(columns) if columns else COLUMNS
+        self._check_columns(columns)
+        sql = (f"SELECT {', '.join(columns)} FROM data "
+               "WHERE summary IS NULL AND id > ? AND content IS NOT NULL AND content != '' ORDER BY id")
+        params = [after_id or 0]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._decode(row) for row in self._connection().execute(sql, params)]
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+STORES = {"supabase": SupabaseStore, "sqlite": SQLiteStore}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def create_store(backend=None):
+    """Build the store named by backend, or by STORAGE_BACKEND (default supabase)"""
+    backend = (backend or os.getenv("STORAGE_BACKEND", "supabase")).lower()
+    if backend not in STORES:
+        raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}, expected one of {', '.join(STORES)}")
+    if backend == "sqlite":
+        return SQLiteStore(os.getenv("SQLITE_DB_FILE", "articles.sqlite3"))
+    return STORES[backend]()
+
+
+def get_store():
+    """Return the shared article store, creating it on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_store()
+    return _store
+
+
+def close_store():
+    """Close the shared store (called on application shutdown)"""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+        _store = None
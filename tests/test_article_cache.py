@@ -0,0 +1,68 @@
+from article_cache import ArticleCache, merge_articles
+
+
+def article(key, created_at, title=""):
+    return {"id": key, "created_at": created_at, "title": title}
+
+
+def test_merge_replaces_in_place_and_adds_newer_first():
+    articles = [article(3, "03"), article(2, "02"), article(1, "01")]
+    merged = merge_articles(articles, [article(2, "02", "edited"), article(4, "04")], 10)
+    assert [a["id"] for a in merged] == [4, 3, 2, 1]
+    assert merged[2]["title"] == "edited"
+
+
+def test_merge_sorts_an_older_article_into_place_and_caps():
+    articles = [article(5, "05"), article(3, "03")]
+    merged = merge_articles(articles, [article(4, "04"), article(6, "06"), article(1, "01")], 4)
+    assert [a["id"] for a in merged] == [6, 5, 4, 3]
+
+
+def test_merge_keeps_one_copy_of_a_repeated_change():
+    merged = merge_articles([article(1, "01")], [article(2, "02", "first"), article(2, "02", "second")], 10)
+    assert [(a["id"], a["title"]) for a in merged] == [(2, "second"), (1, "")]
+
+
+class FakeSource:
+    def __init__(self):
+        self.articles = [article(1, "01")]
+        self.pending = []
+        self.calls = []
+
+    def load(self, max_articles):
+        self.calls.append("load")
+        return list(self.articles)
+
+    def changes(self, since):
+        self.calls.append("changes")
+        if since is None:
+            return [], "position"
+        changed, self.pending = self.pending, []
+        return changed, "position"
+
+
+def test_reloads_fetch_changes_until_a_full_reload_is_asked_for():
+    source = FakeSource()
+    cache = ArticleCache(source.load, ttl=0, changes=source.changes, full_reload=3600)
+    assert [a["id"] for a in cache.get_articles()] == [1]
+    source.pending = [article(2, "02")]
+    assert [a["id"] for a in cache.get_articles()] == [2, 1]
+    assert source.calls == ["changes", "load", "changes"]
+
+    # Something the changes missed turns up on the next full reload
+    source.articles = [article(3, "03"), article(1, "01")]
+    cache.invalidate(full=True)
+    assert [a["id"] for a in cache.get_articles()] == [3, 1]
+    assert source.calls[-2:] == ["changes", "load"]
+
+
+def test_stale_articles_are_served_when_a_reload_fails():
+    source = FakeSource()
+    cache = ArticleCache(source.load, ttl=0)
+    first = cache.get_articles()
+
+    def broken(max_articles):
+        raise RuntimeError("API down")
+
+    cache.loader = broken
+    assert cache.get_articles() is first
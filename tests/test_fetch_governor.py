@@ -0,0 +1,96 @@
+import time
+
+import pytest
+import requests
+
+from fetch_governor import CLOSED, HALF_OPEN, OPEN, FetchGovernor, HostUnavailable
+
+URL = "https://news.example.com/article"
+
+
+def make_governor(cooldown=0.05):
+    # No rate or concurrency limits, only the circuit breaker
+    return FetchGovernor(rate=0, concurrency=0, failure_threshold=2, cooldown=cooldown, max_cooldown=1)
+
+
+def fail(governor, error=None):
+    with pytest.raises(Exception):
+        with governor.request(URL):
+            raise error or requests.ConnectionError("connection refused")
+
+
+def succeed(governor):
+    with governor.request(URL):
+        pass
+
+
+def test_circuit_opens_after_repeated_failures_and_closes_after_a_probe():
+    governor = make_governor()
+    fail(governor)
+    assert governor.host_status(URL)["circuit"] == CLOSED
+    fail(governor)
+    assert governor.host_status(URL)["circuit"] == OPEN
+    with pytest.raises(HostUnavailable):
+        succeed(governor)
+    assert governor.host_status(URL)["rejected"] == 1
+
+    time.sleep(0.06)
+    with governor.request(URL):
+        # Only the probe is let through while the circuit is half open
+        assert governor.host_status(URL)["circuit"] == HALF_OPEN
+        with pytest.raises(HostUnavailable):
+            succeed(governor)
+    assert governor.host_status(URL)["circuit"] == CLOSED
+    assert governor.host_status(URL)["failures_in_a_row"] == 0
+
+
+def test_failed_probe_doubles_the_cooldown():
+    governor = make_governor()
+    fail(governor)
+    fail(governor)
+    time.sleep(0.06)
+    fail(governor)
+    status = governor.host_status(URL)
+    assert status["circuit"] == OPEN
+    assert status["retry_in_seconds"] > 0.05
+    time.sleep(0.06)
+    with pytest.raises(HostUnavailable):
+        succeed(governor)
+    time.sleep(0.08)
+    succeed(governor)
+    assert governor.host_status(URL)["circuit"] == CLOSED
+
+
+def test_missing_pages_do_not_count_against_the_host():
+    governor = make_governor()
+    not_found = requests.Response()
+    not_found.status_code = 404
+    for _ in range(3):
+        fail(governor, requests.HTTPError("404", response=not_found))
+        fail(governor, ValueError("unparseable"))
+    assert governor.host_status(URL)["circuit"] == CLOSED
+
+    unavailable = requests.Response()
+    unavailable.status_code = 503
+    fail(governor, requests.HTTPError("503", response=unavailable))
+    fail(governor, requests.Timeout("read timed out"))
+    assert governor.host_status(URL)["circuit"] == OPEN
+
+
+def test_hosts_are_tracked_separately():
+    governor = make_governor()
+    fail(governor)
+    fail(governor)
+    with governor.request("https://other.example.com/page"):
+        pass
+    assert governor.host_status("https://other.example.com/")["circuit"] == CLOSED
+    assert set(governor.status()) == {"news.example.com", "other.example.com"}
+
+
+def test_token_bucket_spaces_out_requests():
+    governor = FetchGovernor(rate=20, burst=1, concurrency=0)
+    started = time.monotonic()
+    for _ in range(3):
+        succeed(governor)
+    # The burst covers the first request, the next two wait 1/20 s each
+    assert time.monotonic() - started >= 0.09
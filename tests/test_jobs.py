@@ -0,0 +1,38 @@
+import queue
+import threading
+
+from jobs import PollJobManager
+
+
+def test_unsubscribe_keeps_other_listeners():
+    release = threading.Event()
+    started = threading.Event()
+
+    def run(force, progress):
+        progress("fetch", {"feeds_done": 1})
+        started.set()
+        release.wait(5)
+        progress("write", {"written": 1})
+        return {"articles_inserted": 1}
+
+    manager = PollJobManager(run)
+    first, second = queue.Queue(), queue.Queue()
+    first_listener = lambda stage, info: first.put(stage)
+    second_listener = lambda stage, info: second.put(stage)
+    job, coalesced = manager.submit(listener=first_listener)
+    assert not coalesced
+    assert started.wait(5)
+    joined, coalesced = manager.submit(listener=second_listener)
+    assert coalesced and joined["job_id"] == job["job_id"]
+
+    # One stream client goes away while the job is still running
+    manager.unsubscribe(job["job_id"], first_listener)
+    release.set()
+
+    assert second.get(timeout=5) == "write"
+    assert second.get(timeout=5) == "finished"
+    assert first.get(timeout=5) == "fetch"
+    assert first.empty()
+    status = manager.get(job["job_id"])
+    assert status["status"] == "completed"
+    assert status["result"] == {"articles_inserted": 1}
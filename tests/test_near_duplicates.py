@@ -0,0 +1,51 @@
+import pytest
+
+from near_duplicates import NearDuplicateIndex, minhash_signature, similarity
+
+STORY = (
+    "The Tompkins County legislature voted on Tuesday night to approve a new budget for the coming year, "
+    "raising spending on road repairs and public transit while holding the property tax levy flat. "
+    "Several residents spoke during the public comment period, most of them in favor of the transit "
+    "funding, and the chair said the county would revisit library hours in the spring after a review "
+    "of staffing levels across the branches and a survey of how the buildings are used by residents."
+)
+OTHER_STORY = (
+    "Cornell's hockey team beat its rival on Saturday in front of a sold-out crowd at Lynah Rink, "
+    "scoring twice in the final period to come back from a one goal deficit. The coach praised the "
+    "defense after the game and said the team would need the same effort next weekend on the road, "
+    "where it has struggled this season against conference opponents with bigger and faster lines."
+)
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setenv("STATE_DIR", str(tmp_path))
+    return NearDuplicateIndex(threshold=0.8)
+
+
+def test_signatures_estimate_overlap():
+    assert similarity(minhash_signature(STORY), minhash_signature(STORY)) == 1
+    assert similarity(minhash_signature(STORY), minhash_signature(OTHER_STORY)) < 0.2
+    assert minhash_signature("Too short to compare") is None
+
+
+def test_copy_of_a_story_points_at_the_first_one(index):
+    assert index.assign("https://a.example/budget", STORY) is None
+    copy = STORY + " This story first appeared in the Ithaca Voice."
+    assert index.assign("https://b.example/budget", copy) == "https://a.example/budget"
+    assert index.assign("https://c.example/hockey", OTHER_STORY) is None
+    assert index.cluster("https://b.example/budget") == ["https://a.example/budget", "https://b.example/budget"]
+    assert index.cluster("https://c.example/hockey") == ["https://c.example/hockey"]
+
+
+def test_original_keeps_its_role_when_reingested(index):
+    index.assign("https://a.example/budget", STORY)
+    index.assign("https://b.example/budget", STORY)
+    assert index.assign("https://a.example/budget", STORY) is None
+    assert len(index) == 2
+
+
+def test_short_texts_and_missing_links_are_not_indexed(index):
+    assert index.assign("https://a.example/brief", "A short teaser.") is None
+    assert index.assign(None, STORY) is None
+    assert len(index) == 0
@@ -0,0 +1,84 @@
+from search_index import MAX_PREFIX_TERMS, SearchIndex
+
+
+def article(key, title, content="", created_at="2026-01-01"):
+    return {"id": key, "title": title, "content": content, "created_at": created_at}
+
+
+def test_bm25_ranks_title_matches_and_repeated_terms_first():
+    index = SearchIndex()
+    index.sync([
+        article(1, "Weather", "The city budget came up briefly at the end of the meeting."),
+        article(2, "City budget passes", "The council voted on Monday."),
+        article(3, "Roads", "Budget, budget, budget: the road budget was all anyone talked about."),
+        article(4, "Sports", "The team won again."),
+    ])
+    results = index.search("budget")
+    assert set(results.keys()) == {1, 2, 3}
+    assert results.keys()[-1] == 1
+    assert index.search("team")[0]["id"] == 4
+
+
+def test_every_query_term_must_match():
+    index = SearchIndex()
+    index.sync([
+        article(1, "School board", "The school board met."),
+        article(2, "School sports", "The school team won."),
+    ])
+    assert list(index.search("school board").keys()) == [1]
+    assert len(index.search("school library")) == 0
+    # Only stopwords: nothing to filter on
+    assert index.search("the") is None
+
+
+def test_score_ties_break_newest_first():
+    index = SearchIndex()
+    index.sync([
+        article(1, "Fire downtown", created_at="2026-01-01"),
+        article(2, "Fire downtown", created_at="2026-01-03"),
+        article(3, "Fire downtown", created_at="2026-01-02"),
+    ])
+    assert list(index.search("fire").keys()) == [2, 3, 1]
+
+
+def test_last_term_matches_as_prefix():
+    index = SearchIndex()
+    index.sync([
+        article(1, "Council votes"),
+        article(2, "County fair"),
+        article(3, "Weather"),
+    ])
+    assert set(index.search("coun").keys()) == {1, 2}
+    assert list(index.search("council vo").keys()) == [1]
+    # Earlier terms have to match whole
+    assert len(index.search("coun votes")) == 0
+
+
+def test_prefix_keeps_the_most_common_terms():
+    index = SearchIndex()
+    # Many rare terms that sort before the common one
+    rare = [article(i, f"ca{i:03d}") for i in range(MAX_PREFIX_TERMS + 10)]
+    common = [article(1000 + i, "cat show") for i in range(3)]
+    index.sync(rare + common)
+    keys = set(index.search("ca").keys())
+    assert {1000, 1001, 1002} <= keys
+    assert len(keys) == MAX_PREFIX_TERMS + 3 - 1
+
+
+def test_sync_updates_changed_and_removed_articles():
+    index = SearchIndex()
+    index.sync([article(1, "Flood warning"), article(2, "Snow day")])
+    index.sync([article(1, "Flood cleared"), article(3, "Snow again")])
+    assert list(index.search("cleared").keys()) == [1]
+    assert len(index.search("warning")) == 0
+    assert list(index.search("snow").keys()) == [3]
+    assert len(index) == 2
+
+
+def test_results_keep_their_articles_after_a_sync():
+    index = SearchIndex()
+    index.sync([article(1, "Bridge closed"), article(2, "Bridge opens")])
+    results = index.search("bridge")
+    index.sync([article(2, "Bridge opens")])
+    assert len(results) == 2
+    assert {result["id"] for result in results[:]} == {1, 2}
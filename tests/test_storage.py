@@ -0,0 +1,74 @@
+import pytest
+
+from storage import ChangeCursorExpired, SQLiteStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("STATE_DIR", str(tmp_path))
+    store = SQLiteStore()
+    yield store
+    store.close()
+
+
+def add_articles(store, count):
+    store.upsert([{"title": f"Article {i}", "link": f"https://example.com/{i}", "content": f"Text {i}"}
+                  for i in range(count)])
+    return store.list(["id", "created_at", "link"])
+
+
+def test_list_pages_follow_on_without_gaps_or_repeats(store):
+    everything = add_articles(store, 7)
+    pages, after = [], None
+    while True:
+        page = store.list(["id", "created_at", "link"], limit=3, after=after)
+        pages.append([row["id"] for row in page])
+        if len(page) < 3:
+            break
+        after = (page[-1]["created_at"], page[-1]["id"])
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert sum(pages, []) == [row["id"] for row in everything]
+
+
+def test_changes_return_inserts_and_updates_after_a_position(store):
+    add_articles(store, 2)
+    rows, position = store.changes(None)
+    assert rows == []
+
+    store.upsert([{"title": "Updated", "link": "https://example.com/0", "content": "New text"}])
+    store.upsert([{"title": "Added", "link": "https://example.com/9", "content": "More"}])
+    rows, position = store.changes(position, ["link", "title"])
+    assert [row["title"] for row in rows] == ["Updated", "Added"]
+
+    rows, same = store.changes(position)
+    assert rows == [] and same == position
+
+
+def test_changes_page_through_a_long_backlog(store):
+    _, position = store.changes(None)
+    add_articles(store, 5)
+    seen = []
+    while True:
+        rows, position = store.changes(position, ["link"], limit=2)
+        seen += [row["link"] for row in rows]
+        if len(rows) < 2:
+            break
+    assert sorted(seen) == sorted(f"https://example.com/{i}" for i in range(5))
+
+
+def test_changes_from_another_database_expire(store, tmp_path):
+    other = SQLiteStore("other.sqlite3")
+    _, position = other.changes(None)
+    other.close()
+    with pytest.raises(ChangeCursorExpired):
+        store.changes(position)
+
+
+def test_update_by_id_bumps_the_version(store):
+    row = add_articles(store, 1)[0]
+    version = store.version()
+    _, position = store.changes(None)
+    store.update(row["id"], {"summary": "Short", "keywords": ["a", "b"]})
+    assert store.version() != version
+    rows, _ = store.changes(position, ["summary", "keywords"])
+    assert rows == [{"id": row["id"], "summary": "Short", "keywords": ["a", "b"]}]
@@ -0,0 +1,67 @@
+import time
+
+from writer import ArticleWriter
+
+
+class FakeStore:
+    name = "fake"
+
+    def __init__(self, bad_links=()):
+        self.bad_links = set(bad_links)
+        self.upserts = []
+
+    def upsert(self, rows, on_conflict="link"):
+        if any(row["link"] in self.bad_links for row in rows):
+            raise ValueError("rejected row")
+        self.upserts.append([row["link"] for row in rows])
+
+
+def test_rows_are_written_in_batches():
+    store = FakeStore()
+    with ArticleWriter(store, batch_size=2, flush_interval=0) as writer:
+        for i in range(5):
+            writer.add({"link": f"https://example.com/{i}"})
+    assert [len(batch) for batch in store.upserts] == [2, 2, 1]
+    assert writer.written == 5 and writer.batches == 3
+
+
+def test_one_bad_row_does_not_lose_the_rest_of_the_batch():
+    store = FakeStore(bad_links={"https://example.com/bad"})
+    written, failed = [], []
+    writer = ArticleWriter(store, batch_size=10, flush_interval=0,
+                           on_written=lambda row, entry: written.append(entry),
+                           on_failed=lambda row, entry, error: failed.append((entry, str(error))))
+    with writer:
+        writer.add({"link": "https://example.com/a"}, "a")
+        writer.add({"link": "https://example.com/bad"}, "bad")
+        writer.add({"link": "https://example.com/b"}, "b")
+    assert written == ["a", "b"]
+    assert failed == [("bad", "rejected row")]
+    assert writer.written == 2 and writer.failed == 1
+    # The batch was retried one row at a time
+    assert store.upserts == [["https://example.com/a"], ["https://example.com/b"]]
+
+
+def test_latest_copy_of_a_link_wins_within_a_batch():
+    store = FakeStore()
+    written = []
+    with ArticleWriter(store, batch_size=10, flush_interval=0,
+                       on_written=lambda row, entry: written.append(row["title"])) as writer:
+        writer.add({"link": "https://example.com/a", "title": "first"})
+        writer.add({"link": "https://example.com/a", "title": "second"})
+    assert store.upserts == [["https://example.com/a"]]
+    assert written == ["second"]
+
+
+def test_buffered_rows_are_flushed_after_the_interval():
+    store = FakeStore()
+    writer = ArticleWriter(store, batch_size=100, flush_interval=0.05)
+    try:
+        writer.add({"link": "https://example.com/a"})
+        for _ in range(100):
+            if store.upserts:
+                break
+            time.sleep(0.01)
+        assert store.upserts == [["https://example.com/a"]]
+    finally:
+        writer.close()
@@ -0,0 +1,482 @@
+"""Gradio UI: browses the articles served by the API (see api.py)
+
+Run with `python ui.py`. The UI only talks to the API over HTTP (API_URL,
+default http://localhost:8000), so it can run and scale on its own. Gradio
+itself is imported when the interface is built.
+"""
+import json
+import os
+import threading
+
+import requests
+from dotenv import load_dotenv
+
+from article_cache import ArticleCache
+from card_cache import CardCache
+from facets import FacetIndex
+from search_index import SearchIndex
+
+load_dotenv()
+
+
+def api_url(path):
+    """URL of an API route (API_URL, default http://localhost:8000)"""
+    return os.getenv("API_URL", "http://localhost:8000").rstrip("/") + path
+
+# Last /list page per query with its ETag, revalidated with If-None-Match
+LIST_PAGE_CACHE_SIZE = 64
+list_page_cache = {}
+list_page_cache_lock = threading.Lock()
+
+def get_articles_from_api(limit=None, cursor=None, fields=None, publisher=None, search=None):
+    """Fetch one page of articles from the /list endpoint"""
+    params = {"limit": limit, "cursor": cursor, "fields": fields, "publisher": publisher, "search": search}
+    params = {key: value for key, value in params.items() if value is not None}
+    key = tuple(sorted(params.items()))
+    with list_page_cache_lock:
+        cached = list_page_cache.get(key)
+    try:
+        response = requests.get(
+            api_url("/list"),
+            params=params,
+            headers={"If-None-Match": cached[0]} if cached else None
+        )
+        if response.status_code == 304 and cached:
+            return cached[1]
+        if response.status_code == 200:
+            page = response.json()
+            etag = response.headers.get("ETag")
+            if etag:
+                with list_page_cache_lock:
+                    list_page_cache.pop(key, None)
+                    list_page_cache[key] = (etag, page)
+                    # Dicts keep insertion order: drop the least recently stored page
+                    if len(list_page_cache) > LIST_PAGE_CACHE_SIZE:
+                        del list_page_cache[next(iter(list_page_cache))]
+            return page
+        else:
+            return {"error": f"API returned status code {response.status_code}"}
+    except Exception as e:
+        return {"error": f"Failed to fetch articles: {str(e)}"}
+
+def describe_poll_event(event):
+    """Short status line for one /poll/stream event"""
+    stage = event.get("event")
+    if stage == "job":
+        return "Joined running poll..." if event.get("coalesced") else "Poll started..."
+    if stage == "fetch":
+        status = f"error: {event['error']}" if event.get("error") else f"{event.get('feed_articles', 0)} entries"
+        return f"Fetched {event.get('feeds_done')}/{event.get('feeds')} feeds ({event.get('feed')}: {status})"
+    if stage == "filter":
+        return f"{event.get('new')} new articles, {event.get('skipped')} unchanged"
+    if stage == "extract":
+        return f"Extracted {event.get('done')}/{event.get('queued')} articles"
+    if stage == "write":
+        return f"Saved {event.get('written')} articles ({event.get('failed')} failed)"
+    if stage == "finished":
+        if event.get("status") != "completed":
+            return f"Poll failed: {event.get('error')}"
+        result = event.get("result") or {}
+        return f"Poll finished: {result.get('articles_inserted', 0)} articles saved, {result.get('articles_skipped', 0)} unchanged"
+    return ""
+
+def stream_poll_progress():
+    """Follow /poll/stream, yielding a status line per event (for the Gradio UI)"""
+    try:
+        with requests.get(api_url("/poll/stream"), stream=True, timeout=(5, None)) as response:
+            if response.status_code != 200:
+                yield f"Poll failed: API returned status code {response.status_code}"
+                return
+            for line in response.iter_lines():
+                if line:
+                    yield describe_poll_event(json.loads(line))
+    except Exception as e:
+        yield f"Poll failed: {str(e)}"
+
+def create_article_card(article):
+    """Create a formatted article card"""
+    title = article.get("title", "No Title")
+    # List pages carry a pre-truncated excerpt instead of the full body
+    content = article.get("excerpt") or article.get("content", "")
+    description = article.get("description", "")
+    link = article.get("link", "")
+    author = article.get("author", "Unknown")
+    publisher = article.get("publisher", "Unknown")
+    published = article.get("published", "")
+    
+    # Handle None content and truncate for display
+    if content is None:
+        content = ""
+    display_content = content[:500] + "..." if len(content) > 500 else content
+    
+    # Other sources that ran the same story (folded in by StoryClusters)
+    also_html = ""
+    if article.get("also_covered_by"):
+        sources = ", ".join(
+            f'<a href="{other_link}" target="_blank" style="color: #3498db; text-decoration: none;">{other_publisher or "Unknown"}</a>'
+            for other_publisher, other_link in article["also_covered_by"]
+        )
+        also_html = f'<div style="color: #7f8c8d; font-size: 12px; margin-top: 8px;">Also covered by: {sources}</div>'
+    
+    card_html = f"""
+    <div style="border: 1px solid #e0e0e0; border-radius: 8px; padding: 16px; margin: 8px 0; background: white; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
+        <h3 style="margin: 0 0 8px 0; color: #2c3e50; font-size: 18px;">
+            <a href="{link}" target="_blank" style="color: #3498db; text-decoration: none;">{title}</a>
+        </h3>
+        <div style="color: #7f8c8d; font-size: 12px; margin-bottom: 8px;">
+            <span style="margin-right: 16px;">📰 {publisher}</span>
+            <span style="margin-right: 16px;">👤 {author}</span>
+            <span>📅 {published}</span>
+        </div>
+        <p style="color: #34495e; line-height: 1.5; margin: 8px 0;">{display_content}</p>
+        <div style="margin-top: 8px;">
+            <a href="{link}" target="_blank" style="color: #3498db; text-decoration: none; font-weight: bold;">Read Full Article →</a>
+        </div>
+        {also_html}
+    </div>
+    """
+    return card_html
+
+def filter_articles(articles, search_term, publisher_filter):
+    """Filter articles based on search term and publisher"""
+    filtered = articles
+    results = None
+    
+    if search_term:
+        # Ranked lookup in the inverted index, which mirrors the article cache
+        results = search_index.search(search_term)
+        if results is not None:
+            filtered = results
+    
+    if publisher_filter and publisher_filter != "All Publishers":
+        # Intersect with the precomputed publisher facet
+        if results is not None:
+            filtered = publisher_facets.filter(results, publisher_filter)
+        else:
+            filtered = publisher_facets.articles(publisher_filter)
+    
+    return filtered
+
+def publisher_choices():
+    """Dropdown choices: every publisher with its article count"""
+    counts = publisher_facets.counts()
+    return ["All Publishers"] + [(f"{publisher} ({counts[publisher]})", publisher) for publisher in sorted(counts)]
+
+ARTICLES_PER_PAGE = 10
+# Everything the UI searches and shows; created_at/id are needed for paging the API
+CACHE_FIELDS = "id,title,content,description,link,published,author,publisher,created_at,duplicate_of"
+API_PAGE_SIZE = 500
+
+def load_articles_from_api(max_articles):
+    """Page through /list until max_articles (or the whole archive) are loaded"""
+    articles = []
+    cursor = None
+    while len(articles) < max_articles:
+        api_response = get_articles_from_api(
+            limit=min(API_PAGE_SIZE, max_articles - len(articles)),
+            cursor=cursor,
+            fields=CACHE_FIELDS
+        )
+        if "error" in api_response:
+            raise RuntimeError(api_response["error"])
+        articles.extend(api_response.get("articles", []))
+        cursor = api_response.get("next_cursor")
+        if not cursor:
+            break
+    return articles
+
+def load_article_changes(since):
+    """Articles written after a /list/changes position and the new position
+
+    since=None just asks for the current position. Returns None when the UI
+    should reload everything instead: the position expired, or more changed
+    than the cache holds.
+    """
+    changed = []
+    while True:
+        params = {"limit": API_PAGE_SIZE, "fields": CACHE_FIELDS}
+        if since is not None:
+            params["since"] = since
+        try:
+            response = requests.get(api_url("/list/changes"), params=params)
+        except Exception as e:
+            raise RuntimeError(f"Failed to fetch article changes: {str(e)}")
+        if response.status_code != 200:
+            raise RuntimeError(f"API returned status code {response.status_code}")
+        page = response.json()
+        if page.get("reset"):
+            return None
+        changed.extend(page.get("articles", []))
+        since = page.get("since")
+        if len(changed) > article_cache.max_articles:
+            return None
+        if not page.get("has_more"):
+            return changed, since
+
+# Newest articles kept in memory; search, filtering and pagination run against
+# this, with the search index and facets updated incrementally on every reload
+search_index = SearchIndex()
+publisher_facets = FacetIndex("publisher")
+
+class StoryClusters:
+    """Folds near-duplicate articles (duplicate_of set) into the card of the article they repeat"""
+
+    def __init__(self):
+        # (articles synced, article id -> original with also_covered_by, that list collapsed)
+        self._state = ([], {}, [])
+
+    def sync(self, articles):
+        by_link = {article.get("link"): article for article in articles}
+        copies = {}
+        for article in articles:
+            original = by_link.get(article.get("duplicate_of"))
+            if original is not None and original is not article:
+                copies.setdefault(original["id"], []).append(article)
+        shown = {}
+        for original_id, duplicates in copies.items():
+            original = by_link[duplicates[0]["duplicate_of"]]
+            card = {**original, "also_covered_by": [(a.get("publisher"), a.get("link")) for a in duplicates]}
+            shown[original_id] = card
+            for duplicate in duplicates:
+                shown[duplicate["id"]] = card
+        self._state = (articles, shown, self._collapse(articles, shown))
+
+    @staticmethod
+    def _collapse(articles, shown):
+        if not shown:
+            return articles
+        collapsed = []
+        included = set()
+        for article in articles:
+            card = shown.get(article.get("id"))
+            if card is None:
+                collapsed.append(article)
+            elif card["id"] not in included:
+                # A copy found by a search stands in for its original
+                included.add(card["id"])
+                collapsed.append(card)
+        return collapsed
+
+    def collapse(self, articles):
+        """articles with each cluster shown once, as its original"""
+        synced, shown, collapsed = self._state
+        if articles is synced:
+            return collapsed
+        return self._collapse(articles, shown)
+
+story_clusters = StoryClusters()
+
+def index_articles(articles):
+    """Bring the search index, publisher facets and story clusters up to date with the cache"""
+    search_index.sync(articles)
+    publisher_facets.sync(articles)
+    story_clusters.sync(articles)
+
+article_cache = ArticleCache(load_articles_from_api, on_reload=index_articles, changes=load_article_changes)
+# Rendered cards by article id, so paging and filtering don't rebuild them
+article_cards = CardCache(create_article_card)
+
+def display_articles(search_term="", publisher_filter="All Publishers", page=1):
+    """Main function to display articles with filtering and pagination"""
+    # Get articles from the in-process cache (reloaded from the API when stale)
+    try:
+        articles = article_cache.get_articles()
+    except Exception as e:
+        return f"<div style='color: red; padding: 20px;'>Error: {e}</div>"
+    
+    if not articles:
+        return "<div style='padding: 20px; text-align: center; color: #7f8c8d;'>No articles found.</div>"
+    
+    # Filter articles, then show each near-duplicate story once
+    filtered_articles = story_clusters.collapse(filter_articles(articles, search_term, publisher_filter))
+    
+    if not filtered_articles:
+        return "<div style='padding: 20px; text-align: center; color: #7f8c8d;'>No articles match your search criteria.</div>"
+    
+    # Pagination
+    total_articles = len(filtered_articles)
+    total_pages = (total_articles + ARTICLES_PER_PAGE - 1) // ARTICLES_PER_PAGE
+    page = max(1, min(page, total_pages))  # Ensure page is within bounds
+    
+    start_idx = (page - 1) * ARTICLES_PER_PAGE
+    end_idx = start_idx + ARTICLES_PER_PAGE
+    page_articles = filtered_articles[start_idx:end_idx]
+    
+    # Create article cards (cached between renders) with error handling
+    cards = []
+    for article in page_articles:
+        try:
+            cards.append(article_cards.get(article))
+        except Exception as e:
+            # Skip problematic articles
+            print(f"Error creating card for article: {e}")
+            continue
+    cards_html = "".join(cards)
+    
+    # Create pagination controls
+    pagination_html = ""
+    if total_pages > 1:
+        pagination_html = f"""
+        <div style="display: flex; justify-content: center; align-items: center; gap: 10px; margin: 20px 0; padding: 20px; background: white; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
+            <div style="color: #7f8c8d; font-size: 14px;">
+                Page {page} of {total_pages} ({total_articles} articles)
+            </div>
+           
+        </div>
+        """
+    
+    # Create the full HTML
+    html_content = f"""
+    
+        
+        <div style="background: white; padding: 20px; border-radius: 8px; margin-bottom: 20px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
+            <div style="color: #7f8c8d; font-size: 14px; text-align: center;">
+                Showing {len(page_articles)} of {len(filtered_articles)} filtered articles (Page {page} of {total_pages})
+            </div>
+        </div>
+        
+        <div style="display: grid; gap: 16px;">
+            {cards_html}
+        </div>
+        
+        {pagination_html}
+    </div>
+    """
+    
+    return html_content
+
+# Create Gradio interface
+def create_gradio_interface():
+    """Create the Gradio interface"""
+    import gradio as gr
+
+    with gr.Blocks(
+        title="Ithaca News Aggregator",
+        theme=gr.themes.Soft(),
+        css="""
+        .gradio-container {
+            max-width: 1200px !important;
+            margin: 0 auto !important;
+        }
+        """
+    ) as demo:
+        gr.HTML("""
+        <div style="text-align: center; padding: 20px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; border-radius: 10px; margin-bottom: 20px;">
+            <h1 style="margin: 0; font-size: 28px;">📰 Ithaca News Aggregator</h1>
+            <p style="margin: 8px 0 0 0; opacity: 0.9;">Browse the latest articles from local and regional news sources</p>
+        </div>
+        """)
+        
+        with gr.Group():
+            gr.HTML("<div style='background: white; padding: 20px; border-radius: 8px; margin-bottom: 20px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);'><h3 style='margin: 0 0 16px 0; color: #2c3e50;'>🔍 Search & Filter Articles</h3>")
+            with gr.Row():
+                search_input = gr.Textbox(
+                    label="Search Articles",
+                    placeholder="Search by title, content, or description...",
+                    scale=2
+                )
+                publisher_dropdown = gr.Dropdown(
+                    label="Filter by Publisher",
+                    choices=["All Publishers"],
+                    value="All Publishers",
+                    scale=1
+                )
+            
+            with gr.Row():
+                refresh_btn = gr.Button("🔄 Refresh Articles", variant="primary")
+                clear_btn = gr.Button("🗑️ Clear Filters")
+                poll_btn = gr.Button("📡 Poll Feeds")
+            poll_status = gr.Markdown("")
+            gr.HTML("</div>")
+        
+        # Hidden page state
+        page_state = gr.State(1)
+        
+        articles_display = gr.HTML(
+            value="<div style='text-align: center; padding: 40px; color: #7f8c8d;'>Loading articles...</div>",
+            label="Articles"
+        )
+        
+        # Pagination controls
+        with gr.Row():
+            prev_btn = gr.Button("← Previous", variant="secondary")
+            page_info = gr.HTML(value="Page 1")
+            next_btn = gr.Button("Next →", variant="secondary")
+        
+        # Event handlers
+        def update_articles(search_term, publisher_filter, page):
+            return display_articles(search_term, publisher_filter, page)
+        
+        def refresh_articles():
+            article_cache.invalidate(full=True)
+            html = display_articles("", "All Publishers", 1)
+            # Publishers come from the facet index, filled by the reload above
+            publishers = gr.update(choices=publisher_choices(), value="All Publishers")
+            return html, 1, "Page 1", publishers
+        
+        def clear_filters():
+            html = display_articles("", "All Publishers", 1)
+            publishers = gr.update(choices=publisher_choices(), value="All Publishers")
+            return html, 1, "Page 1", publishers
+        
+        def next_page(search_term, publisher_filter, current_page):
+            new_page = current_page + 1
+            return display_articles(search_term, publisher_filter, new_page), new_page, f"Page {new_page}"
+        
+        def prev_page(search_term, publisher_filter, current_page):
+            new_page = max(1, current_page - 1)
+            return display_articles(search_term, publisher_filter, new_page), new_page, f"Page {new_page}"
+        
+        # Bind events
+        search_input.change(
+            fn=update_articles,
+            inputs=[search_input, publisher_dropdown, page_state],
+            outputs=articles_display
+        )
+        
+        publisher_dropdown.change(
+            fn=update_articles,
+            inputs=[search_input, publisher_dropdown, page_state],
+            outputs=articles_display
+        )
+        
+        refresh_btn.click(
+            fn=refresh_articles,
+            outputs=[articles_display, page_state, page_info, publisher_dropdown]
+        )
+        
+        clear_btn.click(
+            fn=clear_filters,
+            outputs=[articles_display, page_state, page_info, publisher_dropdown]
+        )
+        
+        next_btn.click(
+            fn=next_page,
+            inputs=[search_input, publisher_dropdown, page_state],
+            outputs=[articles_display, page_state, page_info]
+        )
+        
+        prev_btn.click(
+            fn=prev_page,
+            inputs=[search_input, publisher_dropdown, page_state],
+            outputs=[articles_display, page_state, page_info]
+        )
+        
+        poll_btn.click(
+            fn=stream_poll_progress,
+            outputs=poll_status
+        )
+        
+        # Initial load
+        demo.load(
+            fn=refresh_articles,
+            outputs=[articles_display, page_state, page_info, publisher_dropdown]
+        )
+    
+    return demo
+
+
+if __name__ == "__main__":
+    create_gradio_interface().launch(
+        server_name="0.0.0.0", server_port=int(os.getenv("UI_PORT", "7860")), share=False
+    )
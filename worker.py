@@ -0,0 +1,84 @@
+"""Ingest worker: polls the feeds on the scheduler's adaptive intervals, without the API or UI
+
+Run with `python worker.py` (or `--once` for a single poll). Start the API
+processes with POLL_SCHEDULER=0 so that only the worker polls. The worker
+also fills in summaries and keywords (see enrichment.py) unless ENRICHMENT=0;
+`--enrich-once` backfills every article still missing them and exits, and
+`--reextract` parses the stored articles again from cached HTML (after a
+parser change) and exits. Its ingest metrics are served at
+:WORKER_METRICS_PORT/metrics (default 8001, 0 turns it off), since the API's
+/metrics only sees polls in the API process.
+"""
+import argparse
+import json
+import os
+import signal
+import threading
+
+from dotenv import load_dotenv
+
+import metrics
+from enrichment import get_enricher
+from extraction import shutdown_parse_pool
+from feeds import RSS_FEEDS
+from html_cache import get_html_cache
+from ingest import add_ingest_listener, ingest_feeds, reextract_articles
+from scheduler import PollScheduler
+from storage import close_store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--once", action="store_true", help="poll every feed once and exit")
+    parser.add_argument("--force", action="store_true", help="with --once, re-read unchanged feeds and entries")
+    parser.add_argument("--enrich-once", action="store_true",
+                        help="add summaries and keywords to every article missing them and exit")
+    parser.add_argument("--reextract", action="store_true",
+                        help="parse stored articles again from the HTML cache, update the changed rows and exit")
+    args = parser.parse_args(argv)
+    load_dotenv()
+
+    enricher = get_enricher()
+    try:
+        if args.enrich_once:
+            print(f"Enriched {enricher.run_pass()} articles")
+            print(json.dumps(enricher.status(), indent=2))
+            return 0
+
+        if args.reextract:
+            result = reextract_articles()
+            result["html_cache"] = get_html_cache().stats()
+            print(json.dumps(result, indent=2))
+            return 0
+
+        if args.once:
+            result = ingest_feeds(RSS_FEEDS, force=args.force)
+            print(json.dumps(result, indent=2, default=str))
+            return 0
+
+        metrics_port = int(os.getenv("WORKER_METRICS_PORT", "8001"))
+        metrics_server = metrics.serve(metrics_port) if metrics_port else None
+        scheduler = PollScheduler(RSS_FEEDS, ingest_feeds)
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        scheduler.start()
+        if os.getenv("ENRICHMENT", "1") != "0":
+            add_ingest_listener(lambda result: enricher.wake())
+            enricher.start()
+        print("Ingest worker polling, Ctrl+C to stop")
+        try:
+            stop.wait()
+        except KeyboardInterrupt:
+            pass
+        scheduler.stop()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        return 0
+    finally:
+        enricher.stop()
+        shutdown_parse_pool()
+        close_store()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,127 @@
+"""Buffered, batched writes of processed articles into the article store"""
+import os
+import threading
+import time
+
+from metrics import DB_ROWS_WRITTEN, DB_WRITE_SECONDS
+
+
+class ArticleWriter:
+    """Collects article rows and flushes them as multi-row upserts keyed on link
+
+    A flush happens when the buffer reaches batch_size rows or when its
+    oldest row has waited flush_interval seconds (checked on add() and by a
+    background timer). If a batch upsert fails, its rows are retried one at a
+    time so a single bad row does not lose the rest of the batch.
+
+    on_written(row, entry) is called for every row that reached the store,
+    on_failed(row, entry, error) for every row that failed on its own too.
+
+    store is a storage.ArticleStore.
+    """
+
+    def __init__(self, store, batch_size=None, flush_interval=None, on_conflict="link", on_written=None,
+                 on_failed=None):
+        if batch_size is None:
+            batch_size = int(os.getenv("DB_BATCH_SIZE", "100"))
+        if flush_interval is None:
+            flush_interval = float(os.getenv("DB_FLUSH_INTERVAL", "2"))
+        self.store = store
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.on_conflict = on_conflict
+        self.on_written = on_written
+        self.on_failed = on_failed
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self._buffer = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._timer = None
+        if self.flush_interval > 0:
+            self._timer = threading.Thread(target=self._flush_periodically, name="article-writer", daemon=True)
+            self._timer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add(self, row, entry=None):
+        """Queue a row for writing, flushing if a threshold has been reached"""
+        with self._lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append((row, entry))
+            due = len(self._buffer) >= self.batch_size or self._is_stale()
+        if due:
+            self.flush()
+
+    def _is_stale(self):
+        return (self.flush_interval > 0 and self._oldest is not None
+                and time.monotonic() - self._oldest >= self.flush_interval)
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval / 2):
+            with self._lock:
+                due = self._is_stale()
+            if due:
+                self.flush()
+
+    def _upsert(self, rows):
+        with DB_WRITE_SECONDS.time(backend=self.store.name):
+            self.store.upsert(rows, on_conflict=self.on_conflict)
+        DB_ROWS_WRITTEN.inc(len(rows), backend=self.store.name)
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of rows written"""
+        with self._flush_lock:
+            with self._lock:
+                batch = self._buffer
+                self._buffer = []
+                self._oldest = None
+            if not batch:
+                return 0
+
+            # Postgres rejects an upsert that touches the same key twice, keep the latest
+            latest = {}
+            for row, entry in batch:
+                latest[row.get(self.on_conflict) or id(row)] = (row, entry)
+            batch = list(latest.values())
+
+            written, failed = [], []
+            try:
+                self._upsert([row for row, _ in batch])
+                written = batch
+            except Exception as e:
+                print(f"Batch upsert of {len(batch)} articles failed, retrying individually: {e}")
+                for row, entry in batch:
+                    try:
+                        self._upsert([row])
+                        written.append((row, entry))
+                    except Exception as row_error:
+                        self.failed += 1
+                        failed.append((row, entry, row_error))
+                        print(f"Error processing article {row.get('link')}: {row_error}")
+
+            self.batches += 1
+            self.written += len(written)
+            if self.on_written is not None:
+                for row, entry in written:
+                    self.on_written(row, entry)
+            if self.on_failed is not None:
+                for row, entry, error in failed:
+                    self.on_failed(row, entry, error)
+            return len(written)
+
+    def close(self):
+        """Flush remaining rows and stop the background timer"""
+        self._closed.set()
+        if self._timer is not None:
+            self._timer.join()
+            self._timer = None
+        self.flush()